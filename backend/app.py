@@ -40,7 +40,7 @@ from models import (
     db, Camera, CameraImage, WildlifeDetection, Species, 
     User, SystemConfig, Analytics, Alert
 )
-from wildlife_detection import WildlifeDetector
+from wildlife_detection import warmup as warmup_wildlife_detector
 from image_processor import ImageProcessor
 from analytics_engine import AnalyticsEngine
 
@@ -68,6 +68,9 @@ class Config:
     MEGADETECTOR_MODEL_PATH = os.environ.get('MEGADETECTOR_MODEL_PATH') or './models/megadetector_v5a.pb'
     MEGADETECTOR_CONFIDENCE_THRESHOLD = float(os.environ.get('MEGADETECTOR_CONFIDENCE_THRESHOLD', '0.2'))
     MEGADETECTOR_API_URL = os.environ.get('MEGADETECTOR_API_URL') or 'https://api.lila.science/batch/v1/detect'
+    # Camera capture resolution, used to trace MegaDetector at startup (0 = trace on first image)
+    CAMERA_FRAME_WIDTH = int(os.environ.get('CAMERA_FRAME_WIDTH', '0'))
+    CAMERA_FRAME_HEIGHT = int(os.environ.get('CAMERA_FRAME_HEIGHT', '0'))
     
     # CORS configuration
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
@@ -152,7 +155,11 @@ def process_image_task(image_id):
         logger.error(f"Error processing image {image_id}: {str(e)}")
 
 # Initialize custom services
-wildlife_detector = WildlifeDetector(app.config['MEGADETECTOR_MODEL_PATH'])
+wildlife_detector = warmup_wildlife_detector(
+    app.config['MEGADETECTOR_MODEL_PATH'],
+    (app.config['CAMERA_FRAME_HEIGHT'], app.config['CAMERA_FRAME_WIDTH'])
+    if app.config['CAMERA_FRAME_HEIGHT'] and app.config['CAMERA_FRAME_WIDTH'] else None
+)
 image_processor = ImageProcessor(app.config['UPLOAD_FOLDER'])
 analytics_engine = AnalyticsEngine()
 
@@ -519,7 +526,7 @@ def upload_image():
             filename=filename,
             file_path=file_path,
             file_size=os.path.getsize(file_path),
-            metadata=request.form.get('metadata', '{}')
+            capture_metadata=request.form.get('metadata', '{}')
         )
         
         db.session.add(image_record)
@@ -616,7 +623,7 @@ def get_image(image_id):
             'camera_id': image.camera_id,
             'camera_name': image.camera.name,
             'file_size': image.file_size,
-            'metadata': image.metadata,
+            'metadata': image.capture_metadata,
             'created_at': image.created_at.isoformat(),
             'detections': [{
                 'id': d.id,
@@ -655,6 +662,37 @@ def serve_image(image_id):
         logger.error(f"Serve image error: {str(e)}")
         return jsonify({'error': 'Failed to serve image'}), 500
 
+@app.route('/api/images/<int:image_id>/thumbnail', methods=['GET'])
+@jwt_required()
+def serve_thumbnail(image_id):
+    """Serve image thumbnail (WebP when the client accepts it, else JPEG)."""
+    try:
+        user_id = get_jwt_identity()
+        image = db.session.query(CameraImage).join(Camera).filter(
+            CameraImage.id == image_id,
+            Camera.user_id == user_id
+        ).first()
+        
+        if not image:
+            return jsonify({'error': 'Image not found'}), 404
+        
+        if not os.path.exists(image.file_path):
+            return jsonify({'error': 'Image file not found'}), 404
+        
+        accepts_webp = 'image/webp' in request.accept_mimetypes.values()
+        thumbnail_path = image_processor.get_thumbnail(
+            image.file_path,
+            image_format='WEBP' if accepts_webp else 'JPEG'
+        )
+        
+        response = send_file(thumbnail_path)
+        response.vary.add('Accept')
+        return response
+        
+    except Exception as e:
+        logger.error(f"Serve thumbnail error: {str(e)}")
+        return jsonify({'error': 'Failed to serve thumbnail'}), 500
+
 # Wildlife detection routes
 @app.route('/api/detections', methods=['GET'])
 @jwt_required()
@@ -0,0 +1,68 @@
+"""
+Redis cache-aside helpers for ESP32 Wildlife Camera backend.
+Caches read-mostly values (organization settings, usage stats) with
+jittered TTLs, falling back to the loader when Redis is unavailable.
+"""
+
+import os
+import json
+import random
+import logging
+from typing import Any, Callable
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or 'redis://localhost:6379/2'
+
+# Fraction of the TTL added at random so keys written together don't expire together
+TTL_JITTER = 0.1
+
+_client = None
+
+def get_client() -> redis.Redis:
+    """Get the shared Redis client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(CACHE_REDIS_URL)
+    return _client
+
+def get_or_set(key: str, ttl: int, loader: Callable[[], Any]) -> Any:
+    """
+    Return the cached value for key, loading and storing it on a miss.
+
+    Args:
+        key: Cache key
+        ttl: Time to live in seconds (jittered upwards by up to TTL_JITTER)
+        loader: Callable producing a JSON-serializable value
+
+    Returns:
+        Cached or freshly loaded value
+    """
+    try:
+        cached = get_client().get(key)
+        if cached is not None:
+            return json.loads(cached)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {str(e)}")
+        return loader()
+
+    value = loader()
+
+    try:
+        expiry = int(ttl * (1 + random.uniform(0, TTL_JITTER)))
+        pipe = get_client().pipeline()
+        pipe.set(key, json.dumps(value, default=str), ex=expiry)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Cache write failed for {key}: {str(e)}")
+
+    return value
+
+def delete(*keys: str) -> None:
+    """Remove keys from the cache."""
+    try:
+        get_client().delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Cache delete failed for {keys}: {str(e)}")
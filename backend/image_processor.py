@@ -9,9 +9,21 @@ from typing import Tuple, Optional
 from PIL import Image, ImageOps, ImageEnhance
 from pathlib import Path
 import hashlib
+import struct
 
 logger = logging.getLogger(__name__)
 
+# JPEG start-of-frame markers that carry the image dimensions
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_HEADER_READ_LIMIT = 64 * 1024
+JPEG_COMPONENT_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+# Read size for content hashing
+HASH_CHUNK_SIZE = 1 << 20
+
+# File extensions for the supported thumbnail formats
+THUMBNAIL_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
 class ImageProcessor:
     """
     Image processing utilities for wildlife camera images.
@@ -31,24 +43,36 @@ class ImageProcessor:
         self.preview_size = (800, 600)
         self.max_image_size = (2048, 1536)
         self.jpeg_quality = 85
+        
+        # Thumbnail encoding (WebP is several times smaller than JPEG at
+        # thumbnail sizes; JPEG remains available for legacy clients)
+        self.thumbnail_format = 'WEBP'
+        self.webp_quality = 75
     
-    def get_thumbnail(self, image_path: str, size: Tuple[int, int] = None) -> str:
+    def get_thumbnail(self, image_path: str, size: Tuple[int, int] = None,
+                      image_format: str = None) -> str:
         """
         Generate or retrieve thumbnail for an image.
         
         Args:
             image_path: Path to original image
             size: Thumbnail size tuple (width, height)
+            image_format: 'WEBP' or 'JPEG' (defaults to self.thumbnail_format)
             
         Returns:
             Path to thumbnail file
         """
         try:
             size = size or self.thumbnail_size
+            image_format = (image_format or self.thumbnail_format).upper()
+            if image_format not in THUMBNAIL_EXTENSIONS:
+                raise ValueError(f"Unsupported thumbnail format: {image_format}")
             
-            # Generate thumbnail filename
+            # Generate thumbnail filename; thumbnails in a different format
+            # from an earlier setting are regenerated lazily on first access
             original_path = Path(image_path)
-            thumbnail_name = f"{original_path.stem}_thumb_{size[0]}x{size[1]}.jpg"
+            extension = THUMBNAIL_EXTENSIONS[image_format]
+            thumbnail_name = f"{original_path.stem}_thumb_{size[0]}x{size[1]}.{extension}"
             thumbnail_path = self.thumbnail_dir / thumbnail_name
             
             # Check if thumbnail already exists
@@ -65,7 +89,10 @@ class ImageProcessor:
                 img.thumbnail(size, Image.Resampling.LANCZOS)
                 
                 # Save thumbnail
-                img.save(thumbnail_path, 'JPEG', quality=self.jpeg_quality, optimize=True)
+                if image_format == 'WEBP':
+                    img.save(thumbnail_path, 'WEBP', quality=self.webp_quality, method=4)
+                else:
+                    img.save(thumbnail_path, 'JPEG', quality=self.jpeg_quality, optimize=True)
                 
                 logger.info(f"Generated thumbnail: {thumbnail_path}")
                 return str(thumbnail_path)
@@ -237,58 +264,161 @@ class ImageProcessor:
             Dictionary with image information
         """
         try:
-            with Image.open(image_path) as img:
-                # Basic image info
-                info = {
-                    'filename': Path(image_path).name,
-                    'format': img.format,
-                    'mode': img.mode,
-                    'size': img.size,
-                    'width': img.size[0],
-                    'height': img.size[1],
-                    'file_size': os.path.getsize(image_path)
-                }
-                
-                # EXIF data if available
-                if hasattr(img, '_getexif') and img._getexif():
-                    exif_data = img._getexif()
-                    if exif_data:
-                        info['exif'] = {}
-                        # Extract common EXIF tags
-                        exif_tags = {
-                            271: 'make',
-                            272: 'model', 
-                            274: 'orientation',
-                            306: 'datetime',
-                            34665: 'exif_ifd'
-                        }
-                        
-                        for tag_id, tag_name in exif_tags.items():
-                            if tag_id in exif_data:
-                                info['exif'][tag_name] = exif_data[tag_id]
-                
-                # Image hash for deduplication
-                info['hash'] = self._calculate_image_hash(image_path)
-                
-                # Aspect ratio
-                info['aspect_ratio'] = round(img.size[0] / img.size[1], 2)
-                
-                return info
-                
+            header = self._read_jpeg_header(image_path)
+            if header is None:
+                return self._get_image_info_pillow(image_path)
+            
+            width, height = header['size']
+            info = {
+                'filename': Path(image_path).name,
+                'format': 'JPEG',
+                'mode': header['mode'],
+                'size': (width, height),
+                'width': width,
+                'height': height,
+                'file_size': os.path.getsize(image_path)
+            }
+            
+            # EXIF data if available (parsed from the APP1 segment only)
+            if header['exif']:
+                exif_data = Image.Exif()
+                exif_data.load(header['exif'])
+                self._add_exif_info(info, exif_data)
+            
+            # Image hash for deduplication
+            info['hash'] = self._calculate_image_hash(image_path)
+            
+            # Aspect ratio
+            info['aspect_ratio'] = round(width / height, 2)
+            
+            return info
+            
         except Exception as e:
             logger.error(f"Failed to get image info for {image_path}: {str(e)}")
             return {}
     
+    def _get_image_info_pillow(self, image_path: str) -> dict:
+        """Get image information through Pillow for non-JPEG formats."""
+        with Image.open(image_path) as img:
+            # Basic image info
+            info = {
+                'filename': Path(image_path).name,
+                'format': img.format,
+                'mode': img.mode,
+                'size': img.size,
+                'width': img.size[0],
+                'height': img.size[1],
+                'file_size': os.path.getsize(image_path)
+            }
+            
+            # EXIF data if available
+            exif_data = img.getexif()
+            if exif_data:
+                self._add_exif_info(info, exif_data)
+            
+            # Image hash for deduplication
+            info['hash'] = self._calculate_image_hash(image_path)
+            
+            # Aspect ratio
+            info['aspect_ratio'] = round(img.size[0] / img.size[1], 2)
+            
+            return info
+    
+    def _add_exif_info(self, info: dict, exif_data) -> None:
+        """Copy common EXIF tags into the image info dictionary."""
+        if not exif_data:
+            return
+        
+        info['exif'] = {}
+        # Extract common EXIF tags
+        exif_tags = {
+            271: 'make',
+            272: 'model', 
+            274: 'orientation',
+            306: 'datetime',
+            34665: 'exif_ifd'
+        }
+        
+        for tag_id, tag_name in exif_tags.items():
+            if tag_id in exif_data:
+                info['exif'][tag_name] = exif_data[tag_id]
+    
+    def _read_jpeg_header(self, image_path: str) -> Optional[dict]:
+        """
+        Read dimensions and the raw EXIF segment from a JPEG header.
+        
+        Only the marker segments ahead of the first scan are read (bounded by
+        JPEG_HEADER_READ_LIMIT), so no entropy-coded image data is touched.
+        
+        Args:
+            image_path: Path to image file
+            
+        Returns:
+            Dictionary with 'size', 'mode' and 'exif' keys, or None if the
+            file is not a JPEG or its header could not be parsed
+        """
+        with open(image_path, 'rb') as f:
+            data = f.read(JPEG_HEADER_READ_LIMIT)
+        
+        if data[:2] != b'\xff\xd8':
+            return None
+        
+        exif = None
+        offset = 2
+        while offset + 4 <= len(data):
+            if data[offset] != 0xFF:
+                return None
+            marker = data[offset + 1]
+            if marker == 0xFF:
+                # Fill byte before a marker
+                offset += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+                # Standalone markers carry no length
+                offset += 2
+                continue
+            if marker == 0xDA:
+                # Start of scan reached without a frame header
+                return None
+            
+            segment_length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+            segment_start = offset + 4
+            segment_end = offset + 2 + segment_length
+            
+            if marker == 0xE1 and exif is None:
+                payload = data[segment_start:segment_end]
+                if payload.startswith(b'Exif\x00\x00'):
+                    exif = payload
+            elif marker in JPEG_SOF_MARKERS:
+                if segment_start + 6 > len(data):
+                    return None
+                _, height, width, components = struct.unpack(
+                    '>BHHB', data[segment_start:segment_start + 6]
+                )
+                if not width or not height:
+                    return None
+                # Frame header precedes the scan; EXIF (APP1) precedes the frame
+                return {
+                    'size': (width, height),
+                    'mode': JPEG_COMPONENT_MODES.get(components, 'RGB'),
+                    'exif': exif
+                }
+            
+            offset = segment_end
+        
+        return None
+    
     def _calculate_image_hash(self, image_path: str) -> str:
         """Calculate hash of image content for deduplication."""
         try:
-            with open(image_path, 'rb') as f:
-                file_hash = hashlib.md5()
-                chunk = f.read(8192)
-                while chunk:
-                    file_hash.update(chunk)
-                    chunk = f.read(8192)
-                return file_hash.hexdigest()
+            file_hash = hashlib.md5()
+            # Reuse one buffer for every read instead of allocating per chunk
+            buffer = bytearray(HASH_CHUNK_SIZE)
+            view = memoryview(buffer)
+            with open(image_path, 'rb', buffering=0) as f:
+                while (bytes_read := f.readinto(view)):
+                    file_hash.update(view[:bytes_read])
+            return file_hash.hexdigest()
         except Exception as e:
             logger.error(f"Failed to calculate hash for {image_path}: {str(e)}")
             return ""
@@ -128,7 +128,9 @@ class CameraImage(db.Model):
     format = db.Column(db.String(10))
     
     # Camera metadata from ESP32
-    metadata = db.Column(JSONB)  # Motion trigger, weather, battery level, etc.
+    # Attribute is not named ``metadata`` because that shadows the declarative
+    # ``Model.metadata``; the underlying column name is unchanged.
+    capture_metadata = db.Column('metadata', JSONB)  # Motion trigger, weather, battery level, etc.
     
     # Processing status
     processed = db.Column(db.Boolean, default=False)
@@ -0,0 +1,24 @@
+-- Upgrade for existing ESP32 Wildlife Camera v3.1 databases.
+-- GIN jsonb_path_ops indexes for JSONB containment (@>) filters.
+-- Fresh databases get these indexes from the SQLAlchemy models.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block:
+--   psql -d wildlife_camera_v31 -f 001_jsonb_path_ops_indexes.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_org_settings_gin
+    ON organizations USING gin (settings jsonb_path_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_org_branding_gin
+    ON organizations USING gin (branding jsonb_path_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_notification_prefs_gin
+    ON users_v31 USING gin (notification_preferences jsonb_path_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_camera_configuration_gin
+    ON cameras_v31 USING gin (configuration jsonb_path_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_camera_ai_models_gin
+    ON cameras_v31 USING gin (ai_models_enabled jsonb_path_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_species_regions_gin
+    ON species_v31 USING gin (regions jsonb_path_ops);
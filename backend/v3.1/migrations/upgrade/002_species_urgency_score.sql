@@ -0,0 +1,21 @@
+-- Upgrade for existing ESP32 Wildlife Camera v3.1 databases.
+-- Stored conservation urgency score generated from conservation_status.
+-- Keep the CASE in sync with CONSERVATION_URGENCY_SCORES in
+-- models/multi_tenant_models.py.
+--
+--   psql -d wildlife_camera_v31 -f 002_species_urgency_score.sql
+
+ALTER TABLE species_v31
+    ADD COLUMN IF NOT EXISTS urgency_score integer GENERATED ALWAYS AS (
+        CASE conservation_status
+            WHEN 'CR' THEN 100
+            WHEN 'EN' THEN 80
+            WHEN 'VU' THEN 60
+            WHEN 'NT' THEN 40
+            WHEN 'LC' THEN 20
+            ELSE 0
+        END
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_species_v31_urgency_score
+    ON species_v31 (urgency_score);
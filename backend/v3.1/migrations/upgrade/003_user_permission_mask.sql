@@ -0,0 +1,20 @@
+-- Upgrade for existing ESP32 Wildlife Camera v3.1 databases.
+-- Precomputed permission bitmask derived from the user's role.
+-- Keep the values in sync with ROLE_MASKS in models/multi_tenant_models.py.
+--
+--   psql -d wildlife_camera_v31 -f 003_user_permission_mask.sql
+
+BEGIN;
+
+ALTER TABLE users_v31 ADD COLUMN IF NOT EXISTS permission_mask bigint;
+
+UPDATE users_v31 SET permission_mask = CASE role
+    WHEN 'ADMIN' THEN -1
+    WHEN 'MANAGER' THEN 4095
+    WHEN 'RESEARCHER' THEN 2019
+    WHEN 'VIEWER' THEN 1697
+    ELSE 0
+END
+WHERE permission_mask IS NULL;
+
+COMMIT;
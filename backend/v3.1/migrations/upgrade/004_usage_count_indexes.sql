@@ -0,0 +1,14 @@
+-- Upgrade for existing ESP32 Wildlife Camera v3.1 databases.
+-- Partial and composite indexes for organization usage and limit counts.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block:
+--   psql -d wildlife_camera_v31 -f 004_usage_count_indexes.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orgs_active
+    ON organizations (id) WHERE is_active;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cam_org_status
+    ON cameras_v31 (organization_id, status);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_org_active
+    ON users_v31 (organization_id) WHERE is_active;
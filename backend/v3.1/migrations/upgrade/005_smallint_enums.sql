@@ -0,0 +1,41 @@
+-- Upgrade for existing ESP32 Wildlife Camera v3.1 databases.
+-- Replace Postgres ENUM columns with SMALLINT codes.
+-- Keep the codes in sync with ENUM_CODES in models/multi_tenant_models.py.
+--
+--   psql -d wildlife_camera_v31 -f 005_smallint_enums.sql
+
+BEGIN;
+
+ALTER TABLE users_v31 ALTER COLUMN role DROP DEFAULT;
+ALTER TABLE users_v31 ALTER COLUMN role TYPE smallint USING CASE role::text
+    WHEN 'ADMIN' THEN 1
+    WHEN 'MANAGER' THEN 2
+    WHEN 'RESEARCHER' THEN 3
+    WHEN 'VIEWER' THEN 4
+END;
+
+ALTER TABLE organization_invitations ALTER COLUMN role DROP DEFAULT;
+ALTER TABLE organization_invitations ALTER COLUMN role TYPE smallint USING CASE role::text
+    WHEN 'ADMIN' THEN 1
+    WHEN 'MANAGER' THEN 2
+    WHEN 'RESEARCHER' THEN 3
+    WHEN 'VIEWER' THEN 4
+END;
+
+ALTER TABLE organizations ALTER COLUMN subscription_tier DROP DEFAULT;
+ALTER TABLE organizations ALTER COLUMN subscription_tier TYPE smallint USING CASE subscription_tier::text
+    WHEN 'BASIC' THEN 1
+    WHEN 'PROFESSIONAL' THEN 2
+    WHEN 'ENTERPRISE' THEN 3
+END;
+
+ALTER TABLE organization_subscriptions ALTER COLUMN tier TYPE smallint USING CASE tier::text
+    WHEN 'BASIC' THEN 1
+    WHEN 'PROFESSIONAL' THEN 2
+    WHEN 'ENTERPRISE' THEN 3
+END;
+
+DROP TYPE IF EXISTS userrole;
+DROP TYPE IF EXISTS organizationsubscriptiontier;
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Upgrade for existing ESP32 Wildlife Camera v3.1 databases.
+-- Stored camera health flag and a partial index over unhealthy cameras.
+-- Keep the expression in sync with EnhancedCamera.healthy in
+-- models/multi_tenant_models.py.
+--
+--   psql -d wildlife_camera_v31 -f 006_camera_is_healthy.sql
+
+ALTER TABLE cameras_v31
+    ADD COLUMN IF NOT EXISTS is_healthy boolean GENERATED ALWAYS AS (
+        status = 'online' AND health_score >= 70 AND
+        (battery_level IS NULL OR battery_level > 20)
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_cam_unhealthy
+    ON cameras_v31 (organization_id) WHERE NOT is_healthy;
@@ -0,0 +1,11 @@
+-- Upgrade for existing ESP32 Wildlife Camera v3.1 databases.
+-- Store invitation tokens as native uuid instead of text.
+--
+--   psql -d wildlife_camera_v31 -f 007_invitation_token_uuid.sql
+
+BEGIN;
+
+ALTER TABLE organization_invitations
+    ALTER COLUMN token TYPE uuid USING token::uuid;
+
+COMMIT;
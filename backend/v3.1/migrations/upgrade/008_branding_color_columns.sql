@@ -0,0 +1,17 @@
+-- Upgrade for existing ESP32 Wildlife Camera v3.1 databases.
+-- Move brand colors out of the branding JSONB into packed 0xRRGGBB integers.
+--
+--   psql -d wildlife_camera_v31 -f 008_branding_color_columns.sql
+
+BEGIN;
+
+ALTER TABLE organizations
+    ADD COLUMN IF NOT EXISTS primary_color_rgb integer,
+    ADD COLUMN IF NOT EXISTS secondary_color_rgb integer;
+
+UPDATE organizations SET
+    primary_color_rgb = ('x' || lpad(ltrim(coalesce(branding->>'primary_color', '#2c5530'), '#'), 8, '0'))::bit(32)::int,
+    secondary_color_rgb = ('x' || lpad(ltrim(coalesce(branding->>'secondary_color', '#4a7856'), '#'), 8, '0'))::bit(32)::int,
+    branding = coalesce(branding, '{}'::jsonb) - 'primary_color' - 'secondary_color';
+
+COMMIT;
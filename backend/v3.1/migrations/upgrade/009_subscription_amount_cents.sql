@@ -0,0 +1,16 @@
+-- Upgrade for existing ESP32 Wildlife Camera v3.1 databases.
+-- Store subscription amounts as integer cents instead of numeric(10, 2).
+--
+--   psql -d wildlife_camera_v31 -f 009_subscription_amount_cents.sql
+
+BEGIN;
+
+ALTER TABLE organization_subscriptions ADD COLUMN IF NOT EXISTS amount_cents bigint;
+
+UPDATE organization_subscriptions
+    SET amount_cents = round(amount * 100)::bigint
+    WHERE amount IS NOT NULL;
+
+ALTER TABLE organization_subscriptions DROP COLUMN amount;
+
+COMMIT;
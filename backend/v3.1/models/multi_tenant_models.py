@@ -3,20 +3,47 @@ Enhanced database models for ESP32 Wildlife Camera Backend v3.1
 Implements multi-tenant architecture with Row Level Security (RLS)
 """
 
+from flask import g, has_app_context
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import json
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy import text, event
+from sqlalchemy import text, event, func, select, inspect
+from sqlalchemy.types import TypeDecorator
 import uuid
+from decimal import Decimal
 from enum import Enum
+from functools import cached_property
+from types import MappingProxyType
+import psycopg2.extras
 from sqlalchemy.ext.declarative import declared_attr
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session, deferred, validates, selectinload, joinedload, object_session
 
 # Import base models from existing system
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
 from models import db
+import cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Decode JSONB with orjson when available (several times faster than json)
+if orjson is not None:
+    psycopg2.extras.register_default_jsonb(loads=orjson.loads, globally=True)
+
+# Cache-aside keys and TTLs for organization data
+ORG_USAGE_CACHE_KEY = 'v1:org:{id}:usage'
+ORG_SETTINGS_CACHE_KEY = 'v1:org:{id}:settings'
+ORG_USAGE_CACHE_TTL = 30
+ORG_SETTINGS_CACHE_TTL = 300
 
 class OrganizationSubscriptionTier(Enum):
     BASIC = "basic"
@@ -29,6 +56,116 @@ class UserRole(Enum):
     RESEARCHER = "researcher"
     VIEWER = "viewer"
 
+# Stable SMALLINT codes for enums stored in the database
+ENUM_CODES = {
+    OrganizationSubscriptionTier: {
+        OrganizationSubscriptionTier.BASIC: 1,
+        OrganizationSubscriptionTier.PROFESSIONAL: 2,
+        OrganizationSubscriptionTier.ENTERPRISE: 3,
+    },
+    UserRole: {
+        UserRole.ADMIN: 1,
+        UserRole.MANAGER: 2,
+        UserRole.RESEARCHER: 3,
+        UserRole.VIEWER: 4,
+    },
+}
+
+class SmallIntEnum(TypeDecorator):
+    """Store a Python enum as its SMALLINT code from ENUM_CODES"""
+    impl = db.SmallInteger
+    cache_ok = True
+    
+    def __init__(self, enum_class):
+        super().__init__()
+        self.enum_class = enum_class
+        self._codes = ENUM_CODES[enum_class]
+        self._members = {code: member for member, code in self._codes.items()}
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self._codes[self.enum_class(value)]
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self._members[value]
+
+# Permission bits for role-based access checks
+PERM_BITS = {
+    'cameras.read': 1 << 0,
+    'cameras.write': 1 << 1,
+    'cameras.delete': 1 << 2,
+    'users.read': 1 << 3,
+    'users.invite': 1 << 4,
+    'analytics.read': 1 << 5,
+    'analytics.export': 1 << 6,
+    'images.read': 1 << 7,
+    'images.verify': 1 << 8,
+    'species.read': 1 << 9,
+    'alerts.read': 1 << 10,
+    'alerts.manage': 1 << 11,
+}
+
+# Permissions granted to each role
+_ROLE_PERMS = {
+    UserRole.ADMIN: frozenset({'*'}),  # All permissions
+    UserRole.MANAGER: frozenset({
+        'cameras.read', 'cameras.write', 'cameras.delete',
+        'users.read', 'users.invite',
+        'analytics.read', 'analytics.export',
+        'images.read', 'images.verify',
+        'species.read', 'alerts.read', 'alerts.manage'
+    }),
+    UserRole.RESEARCHER: frozenset({
+        'cameras.read', 'cameras.write',
+        'analytics.read', 'analytics.export',
+        'images.read', 'images.verify',
+        'species.read', 'alerts.read'
+    }),
+    UserRole.VIEWER: frozenset({
+        'cameras.read', 'analytics.read',
+        'images.read', 'species.read', 'alerts.read'
+    }),
+}
+
+# All bits set; grants every permission, including ones without a bit
+ALL_PERMISSIONS_MASK = -1
+
+def _permissions_to_mask(permissions: frozenset) -> int:
+    """Fold a permission set into its bitmask"""
+    if '*' in permissions:
+        return ALL_PERMISSIONS_MASK
+    mask = 0
+    for permission in permissions:
+        mask |= PERM_BITS[permission]
+    return mask
+
+ROLE_MASKS = {role: _permissions_to_mask(perms) for role, perms in _ROLE_PERMS.items()}
+
+# Conservation urgency score by IUCN status
+CONSERVATION_URGENCY_SCORES = {
+    'CR': 100,  # Critically Endangered
+    'EN': 80,   # Endangered
+    'VU': 60,   # Vulnerable
+    'NT': 40,   # Near Threatened
+    'LC': 20,   # Least Concern
+}
+
+CONSERVATION_URGENCY_SQL = 'CASE conservation_status {} ELSE 0 END'.format(
+    ' '.join(f"WHEN '{status}' THEN {score}"
+             for status, score in CONSERVATION_URGENCY_SCORES.items())
+)
+
+def _rgb_to_hex(rgb):
+    """Format a packed 0xRRGGBB color as '#rrggbb'"""
+    return None if rgb is None else f'#{rgb:06x}'
+
+def _hex_to_rgb(color):
+    """Pack a '#rrggbb' color string as 0xRRGGBB"""
+    return None if color is None else int(color.lstrip('#'), 16)
+
 class MultiTenantMixin:
     """Base mixin for multi-tenant models with organization_id"""
     
@@ -39,6 +176,15 @@ class MultiTenantMixin:
 class Organization(db.Model):
     """Enhanced organization model for multi-tenant support"""
     __tablename__ = 'organizations'
+    # JSONB filters only use containment (@>), which jsonb_path_ops indexes
+    # serve at about half the size of the default jsonb_ops
+    __table_args__ = (
+        db.Index('ix_org_settings_gin', 'settings', postgresql_using='gin',
+                 postgresql_ops={'settings': 'jsonb_path_ops'}),
+        db.Index('ix_org_branding_gin', 'branding', postgresql_using='gin',
+                 postgresql_ops={'branding': 'jsonb_path_ops'}),
+        db.Index('ix_orgs_active', 'id', postgresql_where=text('is_active')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -50,7 +196,7 @@ class Organization(db.Model):
     domain = db.Column(db.String(100))  # email domain for auto-assignment
     
     # Subscription management
-    subscription_tier = db.Column(db.Enum(OrganizationSubscriptionTier), 
+    subscription_tier = db.Column(SmallIntEnum(OrganizationSubscriptionTier),
                                  default=OrganizationSubscriptionTier.BASIC)
     subscription_status = db.Column(db.String(20), default='active')  # active, suspended, cancelled
     subscription_started_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -71,11 +217,13 @@ class Organization(db.Model):
     # Branding and customization
     branding = db.Column(JSONB, default=lambda: {
         'logo_url': None,
-        'primary_color': '#2c5530',
-        'secondary_color': '#4a7856',
         'custom_domain': None,
     })
     
+    # Brand colors packed as 0xRRGGBB; see the primary_color/secondary_color properties
+    primary_color_rgb = db.Column(db.Integer, default=0x2c5530)
+    secondary_color_rgb = db.Column(db.Integer, default=0x4a7856)
+    
     # Contact and billing information
     contact_email = db.Column(db.String(120))
     contact_name = db.Column(db.String(100))
@@ -87,48 +235,219 @@ class Organization(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    users = db.relationship('User', backref='organization', lazy=True,
+    # Collections are never lazy loaded (N+1); use load_with() to fetch them
+    # up front, and get_usage_stats() for counts
+    users = db.relationship('User', backref='organization', lazy='raise',
                            foreign_keys='User.organization_id')
-    cameras = db.relationship('Camera', backref='organization', lazy=True,
+    cameras = db.relationship('Camera', backref='organization', lazy='raise',
                              foreign_keys='Camera.organization_id')
-    invitations = db.relationship('OrganizationInvitation', backref='organization', lazy=True)
-    subscriptions = db.relationship('OrganizationSubscription', backref='organization', lazy=True)
+    invitations = db.relationship('OrganizationInvitation', backref='organization', lazy='raise')
+    subscriptions = db.relationship('OrganizationSubscription', backref='organization', lazy='raise')
+    
+    @property
+    def primary_color(self):
+        """Primary brand color as a '#rrggbb' string"""
+        return _rgb_to_hex(self.primary_color_rgb)
+    
+    @primary_color.setter
+    def primary_color(self, value: str):
+        self.primary_color_rgb = _hex_to_rgb(value)
+    
+    @property
+    def secondary_color(self):
+        """Secondary brand color as a '#rrggbb' string"""
+        return _rgb_to_hex(self.secondary_color_rgb)
+    
+    @secondary_color.setter
+    def secondary_color(self, value: str):
+        self.secondary_color_rgb = _hex_to_rgb(value)
+    
+    @classmethod
+    def matching(cls, where_jsonpath: str):
+        """
+        Get ids of organizations whose settings match a jsonpath predicate.
+        
+        The filter runs as settings @@ jsonpath, which is served by the
+        ix_org_settings_gin index; only @@, @? and @> can use a
+        jsonb_path_ops index. Example: '$.enable_ai_features == true'.
+        """
+        return db.session.execute(
+            select(cls.id).where(text('settings @@ CAST(:jp AS jsonpath)')),
+            {'jp': where_jsonpath}
+        ).scalars().all()
+    
+    @cached_property
+    def settings_view(self):
+        """Read-only view of settings, built once per instance"""
+        return MappingProxyType(self.settings or {})
+    
+    @classmethod
+    def load_with(cls, org_id: int, *relationships: str):
+        """
+        Load an organization with the named collections eagerly loaded.
+        
+        Each collection is fetched with one selectin query, e.g.
+        Organization.load_with(org_id, 'cameras', 'users').
+        """
+        options = [selectinload(getattr(cls, name)) for name in relationships]
+        return db.session.execute(
+            select(cls).options(*options).where(cls.id == org_id)
+        ).scalar_one_or_none()
+    
+    @classmethod
+    def get_settings(cls, org_id: int):
+        """Get organization settings and branding through the cache"""
+        def load():
+            settings, branding, primary_rgb, secondary_rgb = db.session.query(
+                cls.settings, cls.branding, cls.primary_color_rgb, cls.secondary_color_rgb
+            ).filter(cls.id == org_id).one()
+            branding = dict(branding or {})
+            branding['primary_color'] = _rgb_to_hex(primary_rgb)
+            branding['secondary_color'] = _rgb_to_hex(secondary_rgb)
+            return {'settings': settings, 'branding': branding}
+        
+        return cls._cached(ORG_SETTINGS_CACHE_KEY.format(id=org_id),
+                           ORG_SETTINGS_CACHE_TTL, load)
+    
+    @staticmethod
+    def _cached(key: str, ttl: int, loader):
+        """Read through Redis, deduplicated within the current request"""
+        if not has_app_context():
+            return cache.get_or_set(key, ttl, loader)
+        
+        request_cache = g.setdefault('_org_cache', {})
+        if key not in request_cache:
+            request_cache[key] = cache.get_or_set(key, ttl, loader)
+        return request_cache[key]
     
     def get_usage_stats(self):
         """Get current usage statistics for the organization"""
+        return self._cached(ORG_USAGE_CACHE_KEY.format(id=self.id),
+                            ORG_USAGE_CACHE_TTL, self._load_usage_stats)
+    
+    def _load_usage_stats(self):
+        """Aggregate usage statistics from the database in one round trip"""
+        camera_count = select(func.count(EnhancedCamera.id)).where(
+            EnhancedCamera.organization_id == self.id
+        )
+        user_count = select(func.count(EnhancedUser.id)).where(
+            EnhancedUser.organization_id == self.id
+        )
+        
+        active_cameras, total_cameras, active_users, total_users, storage_used_mb = db.session.execute(
+            select(
+                camera_count.where(EnhancedCamera.status == 'online').scalar_subquery(),
+                camera_count.scalar_subquery(),
+                user_count.where(EnhancedUser.is_active.is_(True)).scalar_subquery(),
+                user_count.scalar_subquery(),
+                Organization.storage_used,
+            ).where(Organization.id == self.id)
+        ).one()
+        
         return {
-            'active_cameras': len([c for c in self.cameras if c.status == 'online']),
-            'total_cameras': len(self.cameras),
-            'active_users': len([u for u in self.users if u.is_active]),
-            'total_users': len(self.users),
-            'storage_used_mb': sum([c.get_storage_usage() for c in self.cameras]),
+            'active_cameras': active_cameras,
+            'total_cameras': total_cameras,
+            'active_users': active_users,
+            'total_users': total_users,
+            'storage_used_mb': int(storage_used_mb),
         }
     
+    @hybrid_property
+    def storage_used(self):
+        """Total storage used by the organization's cameras in MB"""
+        return db.session.execute(
+            select(func.coalesce(func.sum(EnhancedCamera.storage_used_mb), 0))
+            .where(EnhancedCamera.organization_id == self.id)
+        ).scalar()
+    
+    @storage_used.expression
+    def storage_used(cls):
+        return (select(func.coalesce(func.sum(EnhancedCamera.storage_used_mb), 0))
+                .where(EnhancedCamera.organization_id == cls.id)
+                .scalar_subquery())
+    
+    @classmethod
+    def _counter(cls, org_id: int, resource: str) -> int:
+        """Count rows of a limited resource, memoized for the current request"""
+        request_counts = None
+        if has_app_context():
+            request_counts = g.setdefault('_org_counters', {})
+            if (org_id, resource) in request_counts:
+                return request_counts[(org_id, resource)]
+        
+        table = {
+            'cameras': EnhancedCamera.__table__,
+            'users': EnhancedUser.__table__,
+        }[resource]
+        count = db.session.execute(
+            select(func.count()).select_from(table).where(table.c.organization_id == org_id)
+        ).scalar()
+        
+        if request_counts is not None:
+            request_counts[(org_id, resource)] = count
+        return count
+    
+    def count_cameras(self) -> int:
+        """Get the number of cameras registered to the organization"""
+        return self._counter(self.id, 'cameras')
+    
+    def count_users(self) -> int:
+        """Get the number of users in the organization"""
+        return self._counter(self.id, 'users')
+    
     def is_within_limits(self, resource_type: str, requested_amount: int = 1):
         """Check if organization is within subscription limits"""
-        current_usage = self.get_usage_stats()
-        limits = self.settings
+        limits = self.settings_view
         
         if resource_type == 'cameras':
-            return current_usage['total_cameras'] + requested_amount <= limits.get('max_cameras', 5)
+            return self.count_cameras() + requested_amount <= limits.get('max_cameras', 5)
         elif resource_type == 'users':
-            return current_usage['total_users'] + requested_amount <= limits.get('max_users', 10)
+            return self.count_users() + requested_amount <= limits.get('max_users', 10)
         
         return True
     
     def __repr__(self):
         return f'<Organization {self.name}>'
 
+@event.listens_for(Organization, 'after_update')
+def invalidate_organization_cache(mapper, connection, target):
+    """
+    Drop in-process organization data when the row changes, and queue its
+    shared cache keys for deletion once the transaction commits.
+    
+    Deleting at flush time would let a concurrent request read the
+    pre-commit row and repopulate the cache with stale data.
+    """
+    target.__dict__.pop('settings_view', None)
+    if has_app_context():
+        g.pop('_org_cache', None)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('_dirty_org_ids', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def delete_committed_organization_cache(session):
+    """Delete shared cache keys of organizations updated in the committed transaction"""
+    org_ids = session.info.pop('_dirty_org_ids', None)
+    if org_ids:
+        cache.delete(*[key.format(id=org_id) for org_id in org_ids
+                       for key in (ORG_USAGE_CACHE_KEY, ORG_SETTINGS_CACHE_KEY)])
+
+@event.listens_for(Session, 'after_rollback')
+def discard_organization_cache_invalidation(session):
+    """Forget queued invalidations; the rolled back changes never became visible"""
+    session.info.pop('_dirty_org_ids', None)
+
 class OrganizationInvitation(db.Model):
     """Model for managing organization invitations"""
     __tablename__ = 'organization_invitations'
     
     id = db.Column(db.Integer, primary_key=True)
-    token = db.Column(db.String(255), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    token = db.Column(UUID(as_uuid=True), unique=True, nullable=False, default=uuid.uuid4, index=True)
     
     # Invitation details
     email = db.Column(db.String(120), nullable=False)
-    role = db.Column(db.Enum(UserRole), default=UserRole.VIEWER)
+    role = db.Column(SmallIntEnum(UserRole), default=UserRole.VIEWER)
     
     # Status tracking
     status = db.Column(db.String(20), default='pending')  # pending, accepted, expired, cancelled
@@ -161,12 +480,12 @@ class OrganizationSubscription(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Subscription details
-    tier = db.Column(db.Enum(OrganizationSubscriptionTier), nullable=False)
+    tier = db.Column(SmallIntEnum(OrganizationSubscriptionTier), nullable=False)
     status = db.Column(db.String(20), nullable=False)  # active, cancelled, expired
     
     # Billing information
     stripe_subscription_id = db.Column(db.String(255))
-    amount = db.Column(db.Numeric(10, 2))
+    amount_cents = db.Column(db.BigInteger)  # See the amount property
     currency = db.Column(db.String(3), default='USD')
     billing_interval = db.Column(db.String(20))  # monthly, yearly
     
@@ -178,6 +497,17 @@ class OrganizationSubscription(db.Model):
     # Foreign keys
     organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False)
     
+    @property
+    def amount(self):
+        """Billing amount in currency units"""
+        if self.amount_cents is None:
+            return None
+        return Decimal(self.amount_cents) / 100
+    
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = None if value is None else int(round(Decimal(str(value)) * 100))
+    
     def __repr__(self):
         return f'<OrganizationSubscription {self.organization.name} - {self.tier.value}>'
 
@@ -185,6 +515,11 @@ class OrganizationSubscription(db.Model):
 class EnhancedUser(db.Model):
     """Enhanced user model with organization and role support"""
     __tablename__ = 'users_v31'
+    __table_args__ = (
+        db.Index('ix_user_notification_prefs_gin', 'notification_preferences', postgresql_using='gin',
+                 postgresql_ops={'notification_preferences': 'jsonb_path_ops'}),
+        db.Index('ix_users_org_active', 'organization_id', postgresql_where=text('is_active')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -192,7 +527,8 @@ class EnhancedUser(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     
     # Enhanced role and organization support
-    role = db.Column(db.Enum(UserRole), default=UserRole.VIEWER)
+    role = db.Column(SmallIntEnum(UserRole), default=UserRole.VIEWER)
+    permission_mask = db.Column(db.BigInteger, default=ROLE_MASKS[UserRole.VIEWER])  # Derived from role
     organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=True)
     
     # Profile information
@@ -231,37 +567,55 @@ class EnhancedUser(db.Model):
     last_login = db.Column(db.DateTime)
     last_seen = db.Column(db.DateTime)
     
+    # Relationships
+    organization = db.relationship('Organization', foreign_keys=[organization_id])
+    
+    @classmethod
+    def load_current(cls, user_id: int):
+        """
+        Load a user with their organization, once per request.
+        
+        The result is kept on flask.g.user so repeated permission checks in
+        the same request don't query the database again.
+        """
+        user = g.get('user')
+        if user is not None and user.id == user_id:
+            return user
+        
+        user = db.session.execute(
+            select(cls).options(joinedload(cls.organization)).where(cls.id == user_id)
+        ).scalar_one_or_none()
+        g.user = user
+        return user
+    
     def get_full_name(self):
         """Get user's full name"""
         if self.first_name and self.last_name:
             return f"{self.first_name} {self.last_name}"
         return self.username
     
+    @validates('role')
+    def _update_permission_mask(self, key, role):
+        """Keep permission_mask in step with the assigned role"""
+        if role is None:
+            self.permission_mask = 0
+            return role
+        # Accept role values ('admin') as well as members; invalid roles raise
+        role = UserRole(role)
+        self.permission_mask = ROLE_MASKS[role]
+        return role
+    
     def has_permission(self, permission: str):
         """Check if user has specific permission based on role"""
-        role_permissions = {
-            UserRole.ADMIN: ['*'],  # All permissions
-            UserRole.MANAGER: [
-                'cameras.read', 'cameras.write', 'cameras.delete',
-                'users.read', 'users.invite',
-                'analytics.read', 'analytics.export',
-                'images.read', 'images.verify',
-                'species.read', 'alerts.read', 'alerts.manage'
-            ],
-            UserRole.RESEARCHER: [
-                'cameras.read', 'cameras.write',
-                'analytics.read', 'analytics.export',
-                'images.read', 'images.verify',
-                'species.read', 'alerts.read'
-            ],
-            UserRole.VIEWER: [
-                'cameras.read', 'analytics.read',
-                'images.read', 'species.read', 'alerts.read'
-            ]
-        }
+        mask = self.permission_mask
+        if mask is None:
+            # Row predates permission_mask; use the role's permission set
+            perms = _ROLE_PERMS.get(self.role, frozenset())
+            return '*' in perms or permission in perms
         
-        user_permissions = role_permissions.get(self.role, [])
-        return '*' in user_permissions or permission in user_permissions
+        if mask == ALL_PERMISSIONS_MASK:
+            return True
+        return bool(mask & PERM_BITS.get(permission, 0))
     
     def __repr__(self):
         return f'<EnhancedUser {self.username}>'
@@ -270,6 +624,14 @@ class EnhancedUser(db.Model):
 class EnhancedCamera(MultiTenantMixin, db.Model):
     """Enhanced camera model with multi-tenant and advanced features"""
     __tablename__ = 'cameras_v31'
+    __table_args__ = (
+        db.Index('ix_camera_configuration_gin', 'configuration', postgresql_using='gin',
+                 postgresql_ops={'configuration': 'jsonb_path_ops'}),
+        db.Index('ix_camera_ai_models_gin', 'ai_models_enabled', postgresql_using='gin',
+                 postgresql_ops={'ai_models_enabled': 'jsonb_path_ops'}),
+        db.Index('ix_cam_org_status', 'organization_id', 'status'),
+        db.Index('ix_cam_unhealthy', 'organization_id', postgresql_where=text('NOT is_healthy')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -285,6 +647,10 @@ class EnhancedCamera(MultiTenantMixin, db.Model):
     # Enhanced status tracking
     status = db.Column(db.String(20), default='offline')  # online, offline, maintenance, error
     health_score = db.Column(db.Float, default=100.0)  # 0-100 health indicator
+    # Generated so dashboards can filter on health by index; see is_healthy()
+    healthy = db.Column('is_healthy', db.Boolean, db.Computed(
+        "status = 'online' AND health_score >= 70 AND "
+        "(battery_level IS NULL OR battery_level > 20)", persisted=True))
     last_seen = db.Column(db.DateTime)
     last_heartbeat = db.Column(db.DateTime)
     
@@ -348,6 +714,27 @@ class EnhancedCamera(MultiTenantMixin, db.Model):
     # Foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
+    @classmethod
+    def list_cameras_json(cls, org_id: int) -> str:
+        """
+        Get the organization's cameras as a JSON array string.
+        
+        The array is built by Postgres (jsonb_agg) and cast to text, so no ORM
+        objects are hydrated and the result can be returned as the response
+        body unchanged.
+        """
+        return db.session.execute(text('''
+            SELECT coalesce(jsonb_agg(to_jsonb(t)), '[]'::jsonb)::text
+            FROM (
+                SELECT id, name, device_id, location, latitude, longitude,
+                       status, health_score, last_seen, battery_level,
+                       signal_strength, connection_type, firmware_version
+                FROM cameras_v31
+                WHERE organization_id = :org_id
+                ORDER BY name
+            ) t
+        '''), {'org_id': org_id}).scalar()
+    
     def get_storage_usage(self):
         """Get storage usage in MB"""
         return self.storage_used_mb or 0
@@ -360,6 +747,13 @@ class EnhancedCamera(MultiTenantMixin, db.Model):
     
     def is_healthy(self):
         """Check if camera is in healthy state"""
+        state = inspect(self)
+        if self.healthy is not None and not any(
+            state.attrs[name].history.has_changes()
+            for name in ('status', 'health_score', 'battery_level')
+        ):
+            return self.healthy
+        # Not yet flushed (no value, or inputs changed since it was computed)
         return (self.status == 'online' and 
                 self.health_score >= 70 and
                 (self.battery_level is None or self.battery_level > 20))
@@ -371,6 +765,13 @@ class EnhancedCamera(MultiTenantMixin, db.Model):
 class EnhancedSpecies(db.Model):
     """Enhanced species model with detailed conservation and regional data"""
     __tablename__ = 'species_v31'
+    __table_args__ = (
+        db.Index('ix_species_regions_gin', 'regions', postgresql_using='gin',
+                 postgresql_ops={'regions': 'jsonb_path_ops'}),
+    )
+    
+    # Bulky detail columns are deferred (group 'detail') so list queries skip
+    # them; detail views load them with undefer_group('detail')
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
@@ -388,6 +789,9 @@ class EnhancedSpecies(db.Model):
     
     # Conservation status (IUCN Red List)
     conservation_status = db.Column(db.String(50))  # LC, NT, VU, EN, CR, EW, EX
+    # Generated from conservation_status so urgency can be sorted by index
+    urgency_score = db.Column(db.Integer, db.Computed(CONSERVATION_URGENCY_SQL, persisted=True),
+                              index=True)
     conservation_trend = db.Column(db.String(20))  # increasing, stable, decreasing, unknown
     population_estimate = db.Column(db.String(100))
     
@@ -400,21 +804,21 @@ class EnhancedSpecies(db.Model):
     habitat_types = db.Column(JSONB)
     activity_patterns = db.Column(JSONB)  # diurnal, nocturnal, crepuscular, cathemeral
     diet_type = db.Column(db.String(50))
-    diet_details = db.Column(JSONB)
+    diet_details = deferred(db.Column(JSONB), group='detail')
     
     # Physical characteristics
-    size_range = db.Column(JSONB)  # {min: 10, max: 30, unit: 'cm'}
-    weight_range = db.Column(JSONB)
-    lifespan = db.Column(JSONB)  # {min: 5, max: 15, unit: 'years'}
+    size_range = deferred(db.Column(JSONB), group='detail')  # {min: 10, max: 30, unit: 'cm'}
+    weight_range = deferred(db.Column(JSONB), group='detail')
+    lifespan = deferred(db.Column(JSONB), group='detail')  # {min: 5, max: 15, unit: 'years'}
     
     # Breeding and reproduction
-    breeding_season = db.Column(JSONB)
+    breeding_season = deferred(db.Column(JSONB), group='detail')
     gestation_period = db.Column(db.String(50))
-    litter_size = db.Column(JSONB)
+    litter_size = deferred(db.Column(JSONB), group='detail')
     
     # Research and monitoring data
     research_priority = db.Column(db.String(20))  # critical, high, medium, low
-    research_notes = db.Column(db.Text)
+    research_notes = deferred(db.Column(db.Text), group='detail')
     monitoring_difficulty = db.Column(db.String(20))  # easy, moderate, difficult
     
     # Detection and AI model information
@@ -429,67 +833,131 @@ class EnhancedSpecies(db.Model):
     is_invasive = db.Column(db.Boolean, default=False)
     
     # Media and documentation
-    description = db.Column(db.Text)
-    identification_notes = db.Column(db.Text)
-    reference_image_urls = db.Column(JSONB)
-    reference_sounds = db.Column(JSONB)
-    external_links = db.Column(JSONB)
+    description = deferred(db.Column(db.Text), group='detail')
+    identification_notes = deferred(db.Column(db.Text), group='detail')
+    reference_image_urls = deferred(db.Column(JSONB), group='detail')
+    reference_sounds = deferred(db.Column(JSONB), group='detail')
+    external_links = deferred(db.Column(JSONB), group='detail')
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    @classmethod
+    def list_species_json(cls, limit: int = 100) -> str:
+        """
+        Get species as a JSON array string, most urgent first.
+        
+        Built by Postgres (jsonb_agg) like EnhancedCamera.list_cameras_json.
+        """
+        return db.session.execute(text('''
+            SELECT coalesce(jsonb_agg(to_jsonb(t)), '[]'::jsonb)::text
+            FROM (
+                SELECT id, name, scientific_name, conservation_status,
+                       conservation_trend, urgency_score, is_endangered,
+                       is_protected, is_endemic, is_invasive
+                FROM species_v31
+                ORDER BY urgency_score DESC, name
+                LIMIT :limit
+            ) t
+        '''), {'limit': limit}).scalar()
+    
     def get_conservation_urgency(self):
         """Get conservation urgency score based on status"""
-        urgency_scores = {
-            'CR': 100,  # Critically Endangered
-            'EN': 80,   # Endangered
-            'VU': 60,   # Vulnerable
-            'NT': 40,   # Near Threatened
-            'LC': 20,   # Least Concern
-        }
-        return urgency_scores.get(self.conservation_status, 0)
+        if self.urgency_score is not None:
+            return self.urgency_score
+        # Not yet flushed, so the generated column has no value
+        return CONSERVATION_URGENCY_SCORES.get(self.conservation_status, 0)
     
     def __repr__(self):
         return f'<EnhancedSpecies {self.name}>'
 
 # Row Level Security setup
+RLS_TABLES = (
+    'cameras_v31',
+    'users_v31',
+    'camera_images',
+    'wildlife_detections',
+    'alerts',
+    'analytics'
+)
+
+# Tables whose rows are restricted to the current organization
+RLS_ORGANIZATION_POLICIES = {
+    # Users can only see cameras in their organization
+    'cameras_organization_policy': 'cameras_v31',
+    # Users can only see other users in their organization
+    'users_organization_policy': 'users_v31',
+}
+
 @event.listens_for(db.Model, 'after_configured', once=True)
 def setup_row_level_security():
     """Setup Row Level Security policies for multi-tenant models"""
     
-    # Enable RLS on tables
-    tables_with_rls = [
-        'cameras_v31',
-        'users_v31',
-        'camera_images',
-        'wildlife_detections',
-        'alerts',
-        'analytics'
-    ]
-    
-    for table in tables_with_rls:
-        db.session.execute(text(f'ALTER TABLE {table} ENABLE ROW LEVEL SECURITY;'))
-    
-    # Create RLS policies
-    # Policy for cameras - users can only see cameras in their organization
-    db.session.execute(text('''
-        CREATE POLICY cameras_organization_policy ON cameras_v31
-        USING (organization_id = current_setting('app.current_organization_id')::int);
-    '''))
-    
-    # Policy for users - users can only see other users in their organization
-    db.session.execute(text('''
-        CREATE POLICY users_organization_policy ON users_v31
-        USING (organization_id = current_setting('app.current_organization_id')::int);
-    '''))
+    # Enable RLS and (re)create the policies in a single round trip
+    statements = [f'ALTER TABLE {table} ENABLE ROW LEVEL SECURITY' for table in RLS_TABLES]
+    for policy, table in RLS_ORGANIZATION_POLICIES.items():
+        statements.append(f'DROP POLICY IF EXISTS {policy} ON {table}')
+        statements.append(
+            f'CREATE POLICY {policy} ON {table} '
+            f"USING (organization_id = current_setting('app.current_organization_id')::int)"
+        )
     
+    db.session.execute(text(';\n'.join(statements) + ';'))
     db.session.commit()
 
+ORGANIZATION_CONTEXT_SQL = text(
+    "SELECT set_config('app.current_organization_id', :org_id, true)"
+)
+
 def set_organization_context(organization_id: int):
-    """Set the current organization context for RLS"""
-    db.session.execute(text('SET app.current_organization_id = :org_id'), {'org_id': organization_id})
+    """
+    Set the current organization context for RLS for the rest of the request.
+    
+    The setting is transaction-local (SET LOCAL semantics), so it never leaks
+    to the next user of a pooled connection and needs no RESET. It is applied
+    again at the start of every transaction in the request.
+    """
+    g.organization_id = organization_id
+    if db.session.in_transaction():
+        db.session.execute(ORGANIZATION_CONTEXT_SQL, {'org_id': str(organization_id)})
+
+@event.listens_for(Session, 'after_begin')
+def apply_organization_context(session, transaction, connection):
+    """Apply the request's organization context to each new transaction"""
+    if has_app_context() and g.get('organization_id') is not None:
+        connection.execute(ORGANIZATION_CONTEXT_SQL, {'org_id': str(g.organization_id)})
+
+# Raised by verify_jwt_in_request(optional=True) for expired or malformed tokens
+JWT_ERRORS = (JWTExtendedException, PyJWTError)
+
+def init_organization_context(app):
+    """Set the RLS organization context from the JWT at the start of each request"""
+    @app.before_request
+    def load_organization_context():
+        # A bad token just means no context; endpoint decorators enforce auth
+        try:
+            verify_jwt_in_request(optional=True)
+        except JWT_ERRORS:
+            return
+        organization_id = get_jwt().get('organization_id')
+        if organization_id is not None:
+            set_organization_context(organization_id)
+
+def init_current_user(app):
+    """Load the authenticated user onto flask.g at the start of each request"""
+    @app.before_request
+    def load_current_user():
+        # A bad token just means no user; endpoint decorators enforce auth
+        try:
+            verify_jwt_in_request(optional=True)
+        except JWT_ERRORS:
+            return
+        user_id = get_jwt_identity()
+        if user_id is not None:
+            EnhancedUser.load_current(user_id)
 
-def clear_organization_context():
-    """Clear the organization context"""
-    db.session.execute(text('RESET app.current_organization_id'))
\ No newline at end of file
+def current_user_has_permission(permission: str) -> bool:
+    """Check a permission for the user loaded by init_current_user()"""
+    user = g.get('user')
+    return user is not None and user.has_permission(permission)
@@ -4,78 +4,162 @@ Implements advanced ML-based analytics including biodiversity metrics,
 activity patterns, anomaly detection, and population trends.
 """
 
+import copy
 import logging
+import math
+import threading
+import time
+import joblib
 import numpy as np
-import pandas as pd
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from heapq import nlargest
+from operator import itemgetter
 from typing import Dict, List, Optional, Tuple, Any
 from sqlalchemy import func, and_, or_, text
+from sqlalchemy.orm import contains_eager, selectinload
 from scipy import stats
 from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import DBSCAN
 import warnings
 warnings.filterwarnings('ignore')
 
+# Numba is optional; without it diversity indices use the NumPy path only
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # Import models
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
 from models import db, Camera, CameraImage, WildlifeDetection, Species, Analytics, User, Alert
+import cache
 from v3_1.models.multi_tenant_models import Organization, EnhancedCamera, EnhancedSpecies
 
 logger = logging.getLogger(__name__)
 
+# Real-time insights are cached per organization and newest detection id, so a
+# new detection changes the key; the TTL bounds staleness as the window slides
+INSIGHTS_CACHE_KEY = 'v1:insights:{org_id}:{latest_id}'
+INSIGHTS_CACHE_TTL = 60
+
+# Hour of day -> activity period: dawn 5-7 AM, day 8 AM - 5 PM, dusk 6-8 PM, night 9 PM - 4 AM
+DAWN, DAY, DUSK, NIGHT = range(4)
+PERIOD = np.array([NIGHT] * 5 + [DAWN] * 3 + [DAY] * 10 + [DUSK] * 3 + [NIGHT] * 3, dtype=np.int8)
+
+def _species_name(detection: WildlifeDetection,
+                  name_by_id: Optional[Dict[Optional[int], str]] = None) -> str:
+    """Get a detection's species name, from name_by_id when given (no relationship load)"""
+    if name_by_id is not None:
+        return name_by_id.get(detection.species_id, 'Unknown')
+    return detection.species.name if detection.species else 'Unknown'
+
+# Below this many species the NumPy path is faster than the JIT kernel call
+FUSED_INDICES_MIN_SPECIES = 256
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _fused_diversity_indices(counts):
+        """Shannon, Simpson and evenness in two passes over the counts"""
+        total = 0.0
+        richness = 0
+        for c in counts:
+            if c > 0:
+                total += c
+                richness += 1
+        
+        if total == 0:
+            return 0.0, 0.0, 1.0
+        
+        shannon = 0.0
+        pairs = 0.0
+        for c in counts:
+            if c > 0:
+                p = c / total
+                shannon -= p * math.log(p)
+                pairs += c * (c - 1.0)
+        
+        simpson = 1.0 - pairs / (total * (total - 1.0)) if total > 1 else 0.0
+        evenness = shannon / math.log(richness) if richness > 1 else 1.0
+        return shannon, simpson, evenness
+
 class BiodiversityAnalyzer:
     """Analyzer for biodiversity metrics using ecological indices"""
     
+    @staticmethod
+    def _counts_array(species_counts) -> np.ndarray:
+        """Get species counts as an int64 array (accepts a dict or an array)"""
+        if isinstance(species_counts, dict):
+            return np.fromiter(species_counts.values(), dtype=np.int64, count=len(species_counts))
+        return np.asarray(species_counts, dtype=np.int64)
+    
     @staticmethod
     def calculate_shannon_index(species_counts: Dict[str, int]) -> float:
         """Calculate Shannon Diversity Index"""
-        if not species_counts:
+        counts = BiodiversityAnalyzer._counts_array(species_counts)
+        if counts.size == 0:
             return 0.0
         
-        total = sum(species_counts.values())
+        total = counts.sum()
         if total == 0:
             return 0.0
         
-        shannon = 0.0
-        for count in species_counts.values():
-            if count > 0:
-                proportion = count / total
-                shannon -= proportion * np.log(proportion)
-        
-        return shannon
+        proportions = counts[counts > 0] / total
+        return float(-(proportions * np.log(proportions)).sum())
     
     @staticmethod
     def calculate_simpson_index(species_counts: Dict[str, int]) -> float:
         """Calculate Simpson Diversity Index"""
-        if not species_counts:
+        counts = BiodiversityAnalyzer._counts_array(species_counts)
+        if counts.size == 0:
             return 0.0
         
-        total = sum(species_counts.values())
+        total = counts.sum()
         if total <= 1:
             return 0.0
         
-        simpson = 0.0
-        for count in species_counts.values():
-            if count > 0:
-                simpson += count * (count - 1)
-        
-        simpson = simpson / (total * (total - 1))
-        return 1 - simpson  # Simpson's Diversity Index (1 - D)
+        counts = counts[counts > 0]
+        simpson = (counts * (counts - 1)).sum() / (total * (total - 1))
+        return float(1 - simpson)  # Simpson's Diversity Index (1 - D)
     
     @staticmethod
     def calculate_species_evenness(species_counts: Dict[str, int]) -> float:
         """Calculate Pielou's Evenness Index"""
-        shannon = BiodiversityAnalyzer.calculate_shannon_index(species_counts)
-        species_richness = len([count for count in species_counts.values() if count > 0])
+        counts = BiodiversityAnalyzer._counts_array(species_counts)
+        shannon = BiodiversityAnalyzer.calculate_shannon_index(counts)
+        species_richness = int(np.count_nonzero(counts > 0))
         
         if species_richness <= 1:
             return 1.0
         
         max_shannon = np.log(species_richness)
-        return shannon / max_shannon if max_shannon > 0 else 0.0
+        return float(shannon / max_shannon) if max_shannon > 0 else 0.0
+    
+    @staticmethod
+    def calculate_diversity_indices(species_counts: Dict[str, int]) -> Tuple[float, float, float]:
+        """
+        Calculate Shannon, Simpson and evenness indices together.
+        
+        Large species tables use a fused Numba kernel when available;
+        otherwise the individual NumPy calculations are used.
+        
+        Returns:
+            (shannon_index, simpson_index, species_evenness)
+        """
+        counts = BiodiversityAnalyzer._counts_array(species_counts)
+        if NUMBA_AVAILABLE and counts.size >= FUSED_INDICES_MIN_SPECIES:
+            shannon, simpson, evenness = _fused_diversity_indices(counts)
+            return float(shannon), float(simpson), float(evenness)
+        
+        return (
+            BiodiversityAnalyzer.calculate_shannon_index(counts),
+            BiodiversityAnalyzer.calculate_simpson_index(counts),
+            BiodiversityAnalyzer.calculate_species_evenness(counts)
+        )
 
 class ActivityPatternAnalyzer:
     """Analyzer for temporal and behavioral activity patterns"""
@@ -86,79 +170,61 @@ class ActivityPatternAnalyzer:
         if not detections:
             return {}
         
-        # Convert to DataFrame for easier analysis
-        data = []
-        for detection in detections:
-            data.append({
-                'species_id': detection.species_id,
-                'species_name': detection.species.name if detection.species else 'Unknown',
-                'datetime': detection.created_at,
-                'hour': detection.created_at.hour,
-                'day_of_week': detection.created_at.weekday(),
-                'month': detection.created_at.month,
-                'confidence': detection.confidence,
-                'behavior': detection.behavior_classification or 'unknown'
-            })
-        
-        df = pd.DataFrame(data)
+        count = len(detections)
+        hours = np.fromiter((d.created_at.hour for d in detections), dtype=np.int8, count=count)
+        months = np.fromiter((d.created_at.month for d in detections), dtype=np.int8, count=count)
+        confidences = np.fromiter((d.confidence for d in detections), dtype=np.float64, count=count)
+        has_species = np.fromiter((d.species_id is not None for d in detections), dtype=np.float64,
+                                  count=count)
         
         # Hourly activity distribution
-        hourly_activity = df.groupby('hour').size().to_dict()
+        hourly = np.bincount(hours, minlength=24)
         
-        # Peak activity hours
-        top_hours = sorted(hourly_activity.items(), key=lambda x: x[1], reverse=True)[:3]
-        peak_hours = [hour for hour, count in top_hours]
+        # Peak activity hours (ties go to the earlier hour)
+        top_hours = np.argsort(-hourly, kind='stable')[:3]
+        peak_hours = [int(hour) for hour in top_hours if hourly[hour] > 0]
         
         # Activity type classification
-        activity_type = ActivityPatternAnalyzer._classify_activity_type(hourly_activity)
+        activity_type = ActivityPatternAnalyzer._classify_activity_type(hourly)
         
-        # Seasonal patterns
-        seasonal_patterns = df.groupby('month').agg({
-            'species_id': 'count',
-            'confidence': 'mean'
-        }).to_dict('index')
+        # Seasonal patterns (detection_count counts detections with a species)
+        month_totals = np.bincount(months, minlength=13)
+        month_species = np.bincount(months, weights=has_species, minlength=13)
+        month_confidence = np.bincount(months, weights=confidences, minlength=13)
         
         # Behavioral patterns
-        behavior_patterns = df.groupby('behavior').size().to_dict()
+        behavior_counts = Counter(d.behavior_classification or 'unknown' for d in detections)
+        behavior_patterns = dict(sorted(behavior_counts.items()))
         
         return {
             'hourly_activity': [
-                {'hour': hour, 'detection_count': hourly_activity.get(hour, 0)}
+                {'hour': hour, 'detection_count': int(hourly[hour])}
                 for hour in range(24)
             ],
             'peak_activity_hours': peak_hours,
             'activity_type': activity_type,
             'seasonal_patterns': [
                 {
-                    'month': month,
-                    'detection_count': data['species_id'],
-                    'avg_confidence': data['confidence']
+                    'month': int(month),
+                    'detection_count': int(month_species[month]),
+                    'avg_confidence': float(month_confidence[month] / month_totals[month])
                 }
-                for month, data in seasonal_patterns.items()
+                for month in np.flatnonzero(month_totals)
             ],
             'behavior_patterns': behavior_patterns
         }
     
     @staticmethod
-    def _classify_activity_type(hourly_activity: Dict[int, int]) -> str:
-        """Classify activity type based on hourly distribution"""
-        if not hourly_activity:
-            return 'unknown'
-        
-        # Calculate activity percentages for different periods
-        dawn_hours = [5, 6, 7]  # 5-7 AM
-        day_hours = [8, 9, 10, 11, 12, 13, 14, 15, 16, 17]  # 8 AM - 5 PM
-        dusk_hours = [18, 19, 20]  # 6-8 PM
-        night_hours = [21, 22, 23, 0, 1, 2, 3, 4]  # 9 PM - 4 AM
-        
-        total_activity = sum(hourly_activity.values())
+    def _classify_activity_type(hourly_activity: np.ndarray) -> str:
+        """Classify activity type based on hourly distribution (24 hourly counts)"""
+        total_activity = hourly_activity.sum()
         if total_activity == 0:
             return 'unknown'
         
-        dawn_activity = sum(hourly_activity.get(h, 0) for h in dawn_hours) / total_activity
-        day_activity = sum(hourly_activity.get(h, 0) for h in day_hours) / total_activity
-        dusk_activity = sum(hourly_activity.get(h, 0) for h in dusk_hours) / total_activity
-        night_activity = sum(hourly_activity.get(h, 0) for h in night_hours) / total_activity
+        # Calculate activity percentages for different periods
+        dawn_activity, day_activity, dusk_activity, night_activity = (
+            np.bincount(PERIOD, weights=hourly_activity, minlength=4) / total_activity
+        )
         
         # Classification thresholds
         if day_activity > 0.6:
@@ -170,153 +236,460 @@ class ActivityPatternAnalyzer:
         else:
             return 'cathemeral'
 
+class RunningScaler:
+    """
+    Feature standardization with running mean/variance (Welford/Chan merge).
+    
+    Equivalent to sklearn's StandardScaler (population std, constant
+    features left unscaled), but batches can be merged into the statistics
+    without revisiting earlier data.
+    """
+    
+    def __init__(self):
+        self.n_samples_seen_ = 0
+        self.mean_ = None
+        self.m2_ = None
+    
+    def partial_fit(self, X: np.ndarray) -> 'RunningScaler':
+        """Merge a batch of samples into the running statistics"""
+        X = np.asarray(X, dtype=np.float64)
+        batch_n = X.shape[0]
+        if batch_n == 0:
+            return self
+        
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        
+        if self.n_samples_seen_ == 0:
+            self.mean_, self.m2_ = batch_mean, batch_m2
+        else:
+            total = self.n_samples_seen_ + batch_n
+            delta = batch_mean - self.mean_
+            self.mean_ = self.mean_ + delta * (batch_n / total)
+            self.m2_ = self.m2_ + batch_m2 + delta ** 2 * (self.n_samples_seen_ * batch_n / total)
+        self.n_samples_seen_ += batch_n
+        return self
+    
+    @property
+    def scale_(self) -> np.ndarray:
+        std = np.sqrt(self.m2_ / self.n_samples_seen_)
+        return np.where(std < 10 * np.finfo(np.float64).eps, 1.0, std)
+    
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Standardize samples with the current statistics"""
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+# Species confidence anomalies: minimum detections per species, z-score
+# threshold (standard deviations below the species mean) and absolute cutoff
+MIN_SPECIES_DETECTIONS = 5
+LOW_CONFIDENCE_Z = 2.0
+LOW_CONFIDENCE_MAX = 0.3
+
 class AnomalyDetector:
     """ML-based anomaly detection for wildlife patterns"""
     
-    def __init__(self):
-        self.isolation_forest = IsolationForest(contamination=0.1, random_state=42)
-        self.scaler = StandardScaler()
+    # Seconds a fitted temporal model is reused before it is refitted
+    MODEL_TTL_SECONDS = 3600
+    
+    # Layout of the temporal feature matrix; bump when the columns change so
+    # cached and persisted models fitted on the old layout are not reused
+    TEMPORAL_FEATURES_VERSION = 1
+    
+    def __init__(self, model_dir: Optional[str] = None):
+        """
+        Args:
+            model_dir: Optional directory where fitted models are persisted
+                with joblib so other worker processes can reuse them
+        """
+        self.model_dir = model_dir
+        # cache key -> (isolation forest, scaler, fitted at timestamp, last day merged into scaler)
+        self._model_cache: Dict[Any, Tuple[IsolationForest, RunningScaler, float, int]] = {}
+        self._model_lock = threading.Lock()
+    
+    def _model_path(self, cache_key) -> str:
+        return os.path.join(self.model_dir, f'temporal_anomaly_{cache_key}.joblib')
+    
+    def _get_cache_entry(self, cache_key) -> Optional[Tuple[IsolationForest, RunningScaler, float, int]]:
+        """Get the cached entry for cache_key, loading a persisted one if needed"""
+        entry = self._model_cache.get(cache_key)
+        if entry is None and self.model_dir and os.path.exists(self._model_path(cache_key)):
+            try:
+                entry = joblib.load(self._model_path(cache_key))
+                self._model_cache[cache_key] = entry
+            except Exception as e:
+                logger.warning(f"Failed to load anomaly model for {cache_key}: {str(e)}")
+        return entry
+    
+    def _get_cached_model(self, cache_key) -> Optional[Tuple[IsolationForest, RunningScaler]]:
+        """Get a fitted (forest, scaler) pair that is still within its TTL"""
+        entry = self._get_cache_entry(cache_key)
+        if entry is None or time.time() - entry[2] > self.MODEL_TTL_SECONDS:
+            return None
+        return entry[0], entry[1]
+    
+    def _fit_model(self, cache_key, features: np.ndarray,
+                   day_values: np.ndarray) -> Tuple[IsolationForest, RunningScaler]:
+        """
+        Fit a (forest, scaler) pair and cache it under cache_key.
+        
+        When an expired entry exists, its scaler is updated with only the
+        days after the last one it has seen instead of being refitted on
+        the whole window; the forest is always refitted.
+        """
+        entry = self._get_cache_entry(cache_key) if cache_key is not None else None
+        if entry is not None:
+            # Copy so threads still scaling with the old entry are unaffected
+            scaler = copy.copy(entry[1]).partial_fit(features[day_values > entry[3]])
+        else:
+            scaler = RunningScaler().partial_fit(features)
+        isolation_forest = IsolationForest(contamination=0.1, random_state=42)
+        isolation_forest.fit(scaler.transform(features))
+        
+        if cache_key is not None:
+            last_day = int(day_values[-1]) if entry is None else max(entry[3], int(day_values[-1]))
+            entry = (isolation_forest, scaler, time.time(), last_day)
+            self._model_cache[cache_key] = entry
+            if self.model_dir:
+                try:
+                    os.makedirs(self.model_dir, exist_ok=True)
+                    joblib.dump(entry, self._model_path(cache_key))
+                except Exception as e:
+                    logger.warning(f"Failed to persist anomaly model for {cache_key}: {str(e)}")
+        
+        return isolation_forest, scaler
     
-    def detect_temporal_anomalies(self, detections: List[WildlifeDetection]) -> List[Dict]:
-        """Detect temporal anomalies in detection patterns"""
+    def detect_temporal_anomalies(self, detections: List[WildlifeDetection],
+                                  cache_key=None) -> List[Dict]:
+        """
+        Detect temporal anomalies in detection patterns.
+        
+        With a cache_key (e.g. the organization id) the fitted model is kept
+        for MODEL_TTL_SECONDS and later calls only run inference.
+        """
         if len(detections) < 10:  # Need minimum data for anomaly detection
             return []
         
-        # Prepare time series data
-        df = pd.DataFrame([{
-            'datetime': d.created_at,
-            'species_id': d.species_id or 0,
-            'confidence': d.confidence,
-            'hour': d.created_at.hour,
-            'day_of_week': d.created_at.weekday(),
-            'day_of_year': d.created_at.timetuple().tm_yday
-        } for d in detections])
+        # Prepare time series data; calendar fields are derived from one
+        # datetime64 array instead of per-row datetime method calls
+        created = np.array([d.created_at for d in detections], dtype='datetime64[us]')
+        days = created.astype('datetime64[D]').astype(np.int64)
+        hours = created.astype('datetime64[h]').astype(np.int64) % 24
+        confidences = np.fromiter((d.confidence for d in detections), dtype=np.float64,
+                                  count=len(detections))
         
         # Aggregate by day
-        daily_stats = df.groupby(df['datetime'].dt.date).agg({
-            'species_id': 'count',
-            'confidence': 'mean',
-            'hour': lambda x: x.mode().iloc[0] if len(x) > 0 else 12
-        }).reset_index()
-        
-        if len(daily_stats) < 5:
+        day_values, day_index = np.unique(days, return_inverse=True)
+        if len(day_values) < 5:
             return []
         
+        daily_counts = np.bincount(day_index)
+        daily_confidence = np.bincount(day_index, weights=confidences) / daily_counts
+        
+        # Modal hour per day (ties go to the earliest hour)
+        hour_table = np.zeros((len(day_values), 24), dtype=np.int64)
+        np.add.at(hour_table, (day_index, hours), 1)
+        daily_peak_hour = hour_table.argmax(axis=1)
+        
         # Feature engineering
-        features = daily_stats[['species_id', 'confidence', 'hour']].values
-        features_scaled = self.scaler.fit_transform(features)
+        features = np.column_stack([daily_counts, daily_confidence, daily_peak_hour]).astype(np.float64)
+        
+        # Reuse a fitted model for this key when one is still fresh
+        if cache_key is not None:
+            cache_key = f'v{self.TEMPORAL_FEATURES_VERSION}_{cache_key}'
+        model = self._get_cached_model(cache_key) if cache_key is not None else None
+        if model is None:
+            with self._model_lock:
+                model = self._get_cached_model(cache_key) if cache_key is not None else None
+                if model is None:
+                    model = self._fit_model(cache_key, features, day_values)
+        isolation_forest, scaler = model
         
         # Detect anomalies
-        anomaly_scores = self.isolation_forest.fit_predict(features_scaled)
+        anomaly_scores = isolation_forest.predict(scaler.transform(features))
         
         anomalies = []
-        for i, (_, row) in enumerate(daily_stats.iterrows()):
-            if anomaly_scores[i] == -1:  # Anomaly detected
-                anomalies.append({
-                    'date': row['datetime'].isoformat(),
-                    'type': 'temporal',
-                    'severity': 'medium',
-                    'description': f'Unusual detection pattern: {row["species_id"]} detections with {row["confidence"]:.2f} avg confidence',
-                    'confidence': 0.7,
-                    'metadata': {
-                        'detection_count': int(row['species_id']),
-                        'avg_confidence': float(row['confidence']),
-                        'peak_hour': int(row['hour'])
-                    }
-                })
+        for i in np.flatnonzero(anomaly_scores == -1):  # Anomaly detected
+            anomalies.append({
+                'date': str(day_values[i].astype('datetime64[D]')),
+                'type': 'temporal',
+                'severity': 'medium',
+                'description': f'Unusual detection pattern: {daily_counts[i]} detections with {daily_confidence[i]:.2f} avg confidence',
+                'confidence': 0.7,
+                'metadata': {
+                    'detection_count': int(daily_counts[i]),
+                    'avg_confidence': float(daily_confidence[i]),
+                    'peak_hour': int(daily_peak_hour[i])
+                }
+            })
         
         return anomalies
     
-    def detect_species_anomalies(self, detections: List[WildlifeDetection]) -> List[Dict]:
-        """Detect anomalies in species detection patterns"""
+    @staticmethod
+    def _flag_low_confidence(confidences: np.ndarray, group_starts: np.ndarray,
+                             group_sizes: np.ndarray, group_order: np.ndarray
+                             ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Flag unusually low confidences within contiguous species blocks.
+        
+        Returns:
+            (flagged positions, their group index, mean confidence per group)
+        """
+        flagged = []
+        flagged_groups = []
+        group_means = np.zeros(len(group_sizes))
+        for g in group_order:
+            if group_sizes[g] < MIN_SPECIES_DETECTIONS:
+                continue
+            
+            start = group_starts[g]
+            group_confidences = confidences[start:start + group_sizes[g]]
+            group_means[g] = group_confidences.mean()
+            std_confidence = group_confidences.std() or 1.0
+            z_scores = np.abs((group_confidences - group_means[g]) / std_confidence)
+            
+            mask = (z_scores > LOW_CONFIDENCE_Z) & (group_confidences < LOW_CONFIDENCE_MAX)
+            positions = start + np.flatnonzero(mask)
+            flagged.append(positions)
+            flagged_groups.append(np.full(len(positions), g))
+        
+        if not flagged:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), group_means
+        return np.concatenate(flagged), np.concatenate(flagged_groups), group_means
+    
+    @staticmethod
+    def _species_anomaly(anomaly_id: int, detection: WildlifeDetection, species_name: str,
+                         avg_confidence: float) -> Dict:
+        """Build a species confidence anomaly record"""
+        return {
+            'id': anomaly_id,
+            'type': 'species_confidence',
+            'severity': 'high' if detection.confidence < 0.2 else 'medium',
+            'description': f'Unusually low confidence detection for {species_name}',
+            'detected_at': detection.created_at.isoformat(),
+            'species_id': detection.species_id,
+            'confidence': 0.8,
+            'metadata': {
+                'detection_confidence': detection.confidence,
+                'species_name': species_name,
+                'avg_confidence': avg_confidence
+            }
+        }
+    
+    def species_anomalies_from_candidates(self, candidates: List[Tuple[WildlifeDetection, float]],
+                                          name_by_id: Optional[Dict[Optional[int], str]] = None
+                                          ) -> List[Dict]:
+        """
+        Build species anomalies from pre-filtered (detection, species mean
+        confidence) pairs, e.g. selected in SQL by the analytics engine
+        """
+        return [
+            self._species_anomaly(i + 1, detection, _species_name(detection, name_by_id),
+                                  avg_confidence)
+            for i, (detection, avg_confidence) in enumerate(candidates)
+        ]
+    
+    def detect_species_anomalies(self, detections: List[WildlifeDetection],
+                                 name_by_id: Optional[Dict[Optional[int], str]] = None) -> List[Dict]:
+        """
+        Detect anomalies in species detection patterns
+        
+        Args:
+            detections: Detections to analyze
+            name_by_id: Optional species id -> name mapping used instead of
+                loading each detection's species relationship
+        """
         if len(detections) < 20:
             return []
         
-        # Group by species and calculate statistics
-        species_stats = {}
-        for detection in detections:
-            species_name = detection.species.name if detection.species else 'Unknown'
-            if species_name not in species_stats:
-                species_stats[species_name] = {
-                    'detections': [],
-                    'confidences': [],
-                    'locations': []
-                }
-            
-            species_stats[species_name]['detections'].append(detection)
-            species_stats[species_name]['confidences'].append(detection.confidence)
+        # Columnar layout: one confidence array and a parallel species id
+        # array, stably sorted so each species is a contiguous block
+        confidences = np.fromiter((d.confidence for d in detections),
+                                  dtype=np.float64, count=len(detections))
+        species_ids = np.fromiter((d.species_id or 0 for d in detections),
+                                  dtype=np.int64, count=len(detections))
+        order = np.argsort(species_ids, kind='stable')
+        confidences = confidences[order]
+        species_ids = species_ids[order]
         
-        anomalies = []
+        # Visit species in order of first detection
+        unique_ids, first_seen, group_sizes = np.unique(
+            species_ids, return_index=True, return_counts=True)
+        group_starts = np.searchsorted(species_ids, unique_ids)
         
-        # Detect confidence anomalies
-        for species_name, stats in species_stats.items():
-            if len(stats['confidences']) < 5:
-                continue
-            
-            confidences = np.array(stats['confidences'])
-            z_scores = np.abs(stats.zscore(confidences))
-            
-            # Flag detections with unusually low confidence
-            low_confidence_threshold = 2.0  # 2 standard deviations
-            low_confidence_indices = np.where(z_scores > low_confidence_threshold)[0]
-            
-            for idx in low_confidence_indices:
-                detection = stats['detections'][idx]
-                if detection.confidence < 0.3:  # Very low confidence
-                    anomalies.append({
-                        'id': len(anomalies) + 1,
-                        'type': 'species_confidence',
-                        'severity': 'high' if detection.confidence < 0.2 else 'medium',
-                        'description': f'Unusually low confidence detection for {species_name}',
-                        'detected_at': detection.created_at.isoformat(),
-                        'species_id': detection.species_id,
-                        'confidence': 0.8,
-                        'metadata': {
-                            'detection_confidence': detection.confidence,
-                            'species_name': species_name,
-                            'avg_confidence': np.mean(confidences)
-                        }
-                    })
+        group_order = np.argsort(order[first_seen], kind='stable')
+        
+        # Flag detections with unusually low confidence (LOW_CONFIDENCE_Z standard
+        # deviations from the species mean and very low in absolute terms)
+        flagged, flagged_groups, group_means = self._flag_low_confidence(
+            confidences, group_starts, group_sizes, group_order)
+        
+        anomalies = []
+        for position, g in zip(flagged, flagged_groups):
+            detection = detections[order[position]]
+            species_name = _species_name(detections[order[group_starts[g]]], name_by_id)
+            anomalies.append(self._species_anomaly(len(anomalies) + 1, detection, species_name,
+                                                   group_means[g]))
         
         return anomalies
 
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _linregress_sums_kernel(counts, lengths):
+        """Per-row mean and centered sums of squares for x = 0..n-1"""
+        rows = lengths.size
+        y_mean = np.empty(rows)
+        ss_x = np.empty(rows)
+        ss_y = np.empty(rows)
+        ss_xy = np.empty(rows)
+        for r in range(rows):
+            n = lengths[r]
+            x_mean = (n - 1) / 2.0
+            total = 0.0
+            for i in range(n):
+                total += counts[r, i]
+            mean = total / n
+            sx = 0.0
+            sy = 0.0
+            sxy = 0.0
+            for i in range(n):
+                dx = i - x_mean
+                dy = counts[r, i] - mean
+                sx += dx * dx
+                sy += dy * dy
+                sxy += dx * dy
+            y_mean[r] = mean
+            ss_x[r] = sx
+            ss_y[r] = sy
+            ss_xy[r] = sxy
+        return y_mean, ss_x, ss_y, ss_xy
+
 class PopulationTrendAnalyzer:
     """Analyzer for population trends and forecasting"""
     
+    @staticmethod
+    def _batch_linregress(series: List[np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Fit y = slope * x + intercept to many series at once, x = 0..n-1.
+        
+        Equivalent to calling scipy.stats.linregress per series, but the
+        series are padded with NaN into one matrix and solved together
+        (the sums come from a compiled kernel when Numba is available).
+        
+        Returns:
+            Dictionary of per-series arrays: slope, intercept, r_value,
+            p_value, std_err, mean, std
+        """
+        lengths = np.array([len(y) for y in series], dtype=np.int64)
+        counts = np.full((len(series), lengths.max()), np.nan)
+        for row, y in enumerate(series):
+            counts[row, :len(y)] = y
+        
+        x_mean = (lengths - 1) / 2.0
+        if NUMBA_AVAILABLE:
+            y_mean, ss_x, ss_y, ss_xy = _linregress_sums_kernel(counts, lengths)
+        else:
+            valid = ~np.isnan(counts)
+            x = np.where(valid, np.arange(counts.shape[1], dtype=np.float64), np.nan)
+            y_mean = np.nanmean(counts, axis=1)
+            dx = x - x_mean[:, None]
+            dy = counts - y_mean[:, None]
+            
+            ss_x = np.nansum(dx * dx, axis=1)
+            ss_y = np.nansum(dy * dy, axis=1)
+            ss_xy = np.nansum(dx * dy, axis=1)
+        
+        slope = ss_xy / ss_x
+        intercept = y_mean - slope * x_mean
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r_value = np.where(ss_y > 0, ss_xy / np.sqrt(ss_x * ss_y), 0.0)
+        r_value = np.clip(r_value, -1.0, 1.0)
+        
+        # Two-sided p-value and slope standard error, as in scipy.stats.linregress
+        dof = lengths - 2
+        tiny = 1.0e-20
+        t_stat = r_value * np.sqrt(dof / ((1.0 - r_value + tiny) * (1.0 + r_value + tiny)))
+        p_value = 2 * stats.t.sf(np.abs(t_stat), dof)
+        std_err = np.sqrt((1 - r_value ** 2) * ss_y / ss_x / dof)
+        
+        return {
+            'slope': slope,
+            'intercept': intercept,
+            'r_value': r_value,
+            'p_value': p_value,
+            'std_err': std_err,
+            'mean': y_mean,
+            'std': np.sqrt(ss_y / lengths)
+        }
+    
     @staticmethod
     def analyze_population_trends(detections: List[WildlifeDetection], 
-                                 time_window_days: int = 90) -> List[Dict]:
-        """Analyze population trends using time series analysis"""
+                                 time_window_days: int = 90,
+                                 name_by_id: Optional[Dict[Optional[int], str]] = None) -> List[Dict]:
+        """
+        Analyze population trends using time series analysis
+        
+        Args:
+            detections: Detections to analyze
+            time_window_days: Analysis window in days
+            name_by_id: Optional species id -> name mapping used instead of
+                loading each detection's species relationship
+        """
         if not detections:
             return []
         
         # Group detections by species and time
+        names = [_species_name(detection, name_by_id) for detection in detections]
+        day_counts = Counter(zip(names, (detection.created_at.date() for detection in detections)))
         species_data = {}
-        for detection in detections:
-            species_name = detection.species.name if detection.species else 'Unknown'
-            date = detection.created_at.date()
-            
-            if species_name not in species_data:
-                species_data[species_name] = {}
-            
-            if date not in species_data[species_name]:
-                species_data[species_name][date] = 0
-            
-            species_data[species_name][date] += 1
+        for (species_name, date), count in day_counts.items():
+            species_data.setdefault(species_name, {})[date] = count
         
-        trends = []
+        # First species id seen for each name (reversed so earlier detections win)
+        species_ids = dict(zip(reversed(names), (d.species_id for d in reversed(detections))))
         
+        # Species with enough data points for a trend
+        series_names = []
+        series_dates = []
+        series_counts = []
         for species_name, date_counts in species_data.items():
             if len(date_counts) < 10:  # Need minimum data points
                 continue
             
             # Create time series
             dates = sorted(date_counts.keys())
-            counts = [date_counts[date] for date in dates]
-            
-            # Calculate trend using linear regression
-            x = np.arange(len(dates))
-            slope, intercept, r_value, p_value, std_err = stats.linregress(x, counts)
+            series_names.append(species_name)
+            series_dates.append(dates)
+            series_counts.append(np.array([date_counts[date] for date in dates], dtype=np.float64))
+        
+        if not series_names:
+            return []
+        
+        # Calculate trends for all species with one batched linear regression
+        regression = PopulationTrendAnalyzer._batch_linregress(series_counts)
+        
+        # Generate forecasts (simple linear projection) for all species at once
+        forecast_days = 30
+        lengths = np.array([len(dates) for dates in series_dates])
+        forecast_x = lengths[:, None] + np.arange(forecast_days)[None, :]
+        predicted = np.maximum(regression['slope'][:, None] * forecast_x
+                               + regression['intercept'][:, None], 0)
+        margin = 1.96 * regression['std_err'][:, None]
+        lower = np.maximum(predicted - margin, 0).tolist()
+        upper = (predicted + margin).tolist()
+        predicted = predicted.tolist()
+        forecast_offsets = [timedelta(days=i + 1) for i in range(forecast_days)]
+        
+        trends = []
+        
+        for k, species_name in enumerate(series_names):
+            dates = series_dates[k]
+            slope = regression['slope'][k]
+            intercept = regression['intercept'][k]
+            r_value = regression['r_value'][k]
+            p_value = regression['p_value'][k]
+            std_err = regression['std_err'][k]
+            mean_count = regression['mean'][k]
             
             # Determine trend direction
             if abs(slope) < 0.01:  # Very small slope
@@ -324,36 +697,29 @@ class PopulationTrendAnalyzer:
                 trend_percentage = 0.0
             elif slope > 0:
                 trend_direction = 'increasing'
-                trend_percentage = (slope * len(dates) / np.mean(counts)) * 100
+                trend_percentage = (slope * len(dates) / mean_count) * 100
             else:
                 trend_direction = 'decreasing'
-                trend_percentage = abs((slope * len(dates) / np.mean(counts)) * 100)
+                trend_percentage = abs((slope * len(dates) / mean_count) * 100)
             
             # Confidence level based on R-squared and p-value
             confidence_level = min(r_value**2 * 100, 90)  # Max 90% confidence
             if p_value > 0.05:
                 confidence_level *= 0.5  # Reduce confidence for non-significant trends
             
-            # Generate forecast (simple linear projection)
-            forecast_days = 30
-            forecast_data = []
-            for i in range(forecast_days):
-                future_x = len(dates) + i
-                predicted_count = max(0, slope * future_x + intercept)
-                confidence_interval = {
-                    'lower': max(0, predicted_count - 1.96 * std_err),
-                    'upper': predicted_count + 1.96 * std_err
-                }
-                
-                forecast_data.append({
-                    'date': (dates[-1] + timedelta(days=i+1)).isoformat(),
+            last_date = dates[-1]
+            forecast_data = [
+                {
+                    'date': (last_date + offset).isoformat(),
                     'predicted_count': predicted_count,
-                    'confidence_interval': confidence_interval
-                })
+                    'confidence_interval': {'lower': low, 'upper': high}
+                }
+                for offset, predicted_count, low, high in zip(
+                    forecast_offsets, predicted[k], lower[k], upper[k])
+            ]
             
             trends.append({
-                'species_id': next((d.species_id for d in detections 
-                                  if d.species and d.species.name == species_name), None),
+                'species_id': species_ids[species_name],
                 'species_name': species_name,
                 'trend_direction': trend_direction,
                 'trend_percentage': round(trend_percentage, 2),
@@ -367,8 +733,8 @@ class PopulationTrendAnalyzer:
                     'slope': slope,
                     'r_squared': r_value**2,
                     'p_value': p_value,
-                    'mean_detections': np.mean(counts),
-                    'std_detections': np.std(counts)
+                    'mean_detections': mean_count,
+                    'std_detections': regression['std'][k]
                 }
             })
         
@@ -382,22 +748,34 @@ class ConservationAlertSystem:
                                    species_data: List[EnhancedSpecies]) -> List[Dict]:
         """Generate conservation alerts based on trends and species status"""
         alerts = []
+        if not species_trends:
+            return alerts
         
         # Create species lookup
         species_lookup = {s.id: s for s in species_data}
         
-        for trend in species_trends:
-            species_id = trend.get('species_id')
-            if not species_id or species_id not in species_lookup:
-                continue
-            
+        # Evaluate both alert conditions over all trends at once
+        trend_species = [species_lookup.get(trend.get('species_id')) if trend.get('species_id') else None
+                         for trend in species_trends]
+        count = len(species_trends)
+        is_endangered = np.fromiter((bool(s and s.is_endangered) for s in trend_species), dtype=bool, count=count)
+        is_protected = np.fromiter((bool(s and s.is_protected) for s in trend_species), dtype=bool, count=count)
+        decreasing = np.fromiter((t['trend_direction'] == 'decreasing' for t in species_trends),
+                                 dtype=bool, count=count)
+        confidence = np.fromiter((t['confidence_level'] for t in species_trends), dtype=np.float64, count=count)
+        percentage = np.fromiter((t['trend_percentage'] for t in species_trends), dtype=np.float64, count=count)
+        
+        critical = is_endangered & decreasing & (confidence > 60)
+        high = ~critical & is_protected & decreasing & (percentage > 30)
+        created_at = datetime.utcnow().isoformat()
+        
+        for i in np.flatnonzero(critical | high):
+            trend = species_trends[i]
+            species_id = trend['species_id']
             species = species_lookup[species_id]
             
             # Alert for declining endangered species
-            if (species.is_endangered and 
-                trend['trend_direction'] == 'decreasing' and 
-                trend['confidence_level'] > 60):
-                
+            if critical[i]:
                 alerts.append({
                     'id': len(alerts) + 1,
                     'species_id': species_id,
@@ -411,15 +789,12 @@ class ConservationAlertSystem:
                         'Consider intervention measures',
                         'Notify conservation authorities'
                     ],
-                    'created_at': datetime.utcnow().isoformat(),
+                    'created_at': created_at,
                     'trend_data': trend
                 })
             
             # Alert for unusual patterns in protected species
-            elif (species.is_protected and 
-                  trend['trend_direction'] == 'decreasing' and 
-                  trend['trend_percentage'] > 30):
-                
+            else:
                 alerts.append({
                     'id': len(alerts) + 1,
                     'species_id': species_id,
@@ -433,7 +808,7 @@ class ConservationAlertSystem:
                         'Review seasonal patterns',
                         'Consult with wildlife experts'
                     ],
-                    'created_at': datetime.utcnow().isoformat(),
+                    'created_at': created_at,
                     'trend_data': trend
                 })
         
@@ -442,6 +817,9 @@ class ConservationAlertSystem:
 class EnhancedAnalyticsEngine:
     """Main analytics engine combining all analyzers"""
     
+    # Threads used to run the independent analyzer stages
+    ANALYZER_WORKERS = 4
+    
     def __init__(self):
         self.biodiversity_analyzer = BiodiversityAnalyzer()
         self.activity_analyzer = ActivityPatternAnalyzer()
@@ -450,6 +828,74 @@ class EnhancedAnalyticsEngine:
         self.conservation_system = ConservationAlertSystem()
         self.logger = logging.getLogger(__name__)
     
+    @staticmethod
+    def _filter_detections(query, organization_id: Optional[int] = None,
+                           camera_ids: Optional[List[int]] = None,
+                           start_date: Optional[datetime] = None,
+                           end_date: Optional[datetime] = None):
+        """Join a detection query to its image and camera and apply the filters"""
+        query = query.join(CameraImage, WildlifeDetection.image_id == CameraImage.id)
+        query = query.join(Camera, CameraImage.camera_id == Camera.id)
+        
+        if start_date:
+            query = query.filter(CameraImage.timestamp >= start_date)
+        if end_date:
+            query = query.filter(CameraImage.timestamp <= end_date)
+        
+        if organization_id:
+            query = query.filter(Camera.organization_id == organization_id)
+        
+        if camera_ids:
+            query = query.filter(Camera.id.in_(camera_ids))
+        
+        return query
+    
+    def _species_counts(self, **filters) -> List[Tuple[Optional[int], str, int]]:
+        """Count detections per species in SQL, as (species_id, name, count) rows"""
+        species_name = func.coalesce(Species.name, 'Unknown')
+        query = db.session.query(
+            WildlifeDetection.species_id, species_name, func.count(WildlifeDetection.id)
+        ).select_from(WildlifeDetection)
+        query = self._filter_detections(query, **filters)
+        query = query.outerjoin(Species, WildlifeDetection.species_id == Species.id)
+        return query.group_by(WildlifeDetection.species_id, species_name).all()
+    
+    def _species_anomaly_candidates(self, **filters) -> List[Tuple[WildlifeDetection, float]]:
+        """
+        Select only the detections that are species confidence anomalies.
+        
+        Per-species mean/std are computed in a CTE and joined back, so rows
+        that can never be flagged stay in the database.
+        """
+        confidence = WildlifeDetection.confidence
+        species_stats = db.session.query(
+            WildlifeDetection.species_id.label('species_id'),
+            func.avg(confidence).label('avg_confidence'),
+            func.stddev_pop(confidence).label('std_confidence'),
+            func.count(WildlifeDetection.id).label('detections')
+        ).select_from(WildlifeDetection)
+        species_stats = self._filter_detections(species_stats, **filters)
+        species_stats = species_stats.group_by(WildlifeDetection.species_id).cte('species_confidence_stats')
+        
+        # Constant-confidence species are left unscaled, as in the NumPy path
+        std_confidence = func.coalesce(func.nullif(species_stats.c.std_confidence, 0), 1.0)
+        
+        query = db.session.query(WildlifeDetection, species_stats.c.avg_confidence).join(
+            species_stats, WildlifeDetection.species_id.is_not_distinct_from(species_stats.c.species_id)
+        )
+        query = self._filter_detections(query, **filters)
+        query = query.filter(
+            species_stats.c.detections >= MIN_SPECIES_DETECTIONS,
+            confidence < LOW_CONFIDENCE_MAX,
+            func.abs(confidence - species_stats.c.avg_confidence) / std_confidence > LOW_CONFIDENCE_Z
+        )
+        return query.order_by(WildlifeDetection.species_id, WildlifeDetection.id).all()
+    
+    def _latest_detection_id(self, **filters) -> Optional[int]:
+        """Get the newest detection id matching the filters (cheap change fingerprint)"""
+        query = db.session.query(func.max(WildlifeDetection.id)).select_from(WildlifeDetection)
+        return self._filter_detections(query, **filters).scalar()
+    
     def generate_comprehensive_analytics(self, 
                                        organization_id: Optional[int] = None,
                                        camera_ids: Optional[List[int]] = None,
@@ -464,55 +910,77 @@ class EnhancedAnalyticsEngine:
             start_date = end_date - timedelta(days=30)
         
         try:
-            # Build query for detections
-            query = db.session.query(WildlifeDetection).join(CameraImage).join(Camera)
-            
-            # Apply filters
-            query = query.filter(CameraImage.timestamp >= start_date)
-            query = query.filter(CameraImage.timestamp <= end_date)
-            
-            if organization_id:
-                query = query.filter(Camera.organization_id == organization_id)
+            filters = {
+                'organization_id': organization_id,
+                'camera_ids': camera_ids,
+                'start_date': start_date,
+                'end_date': end_date
+            }
             
-            if camera_ids:
-                query = query.filter(Camera.id.in_(camera_ids))
+            # Per-species counts are aggregated in the database
+            species_rows = self._species_counts(**filters)
+            species_counts = Counter()
+            name_by_id = {}
+            for species_id, species_name, count in species_rows:
+                species_counts[species_name] += count
+                name_by_id[species_id] = species_name
             
+            # Raw detections for the time-series analyzers. Analyzers look
+            # species names up in name_by_id; species is still batch-loaded
+            # so other callers touching it don't issue one query per row
+            query = self._filter_detections(db.session.query(WildlifeDetection), **filters)
+            query = query.options(contains_eager(WildlifeDetection.image),
+                                  selectinload(WildlifeDetection.species))
             detections = query.all()
             
             # Get species data
             species_query = db.session.query(EnhancedSpecies)
             if organization_id:
                 # Filter species relevant to organization's detections
-                detected_species_ids = [d.species_id for d in detections if d.species_id]
+                detected_species_ids = [species_id for species_id, _, _ in species_rows if species_id]
                 if detected_species_ids:
                     species_query = species_query.filter(EnhancedSpecies.id.in_(detected_species_ids))
             
             species_data = species_query.all()
             
             # Calculate biodiversity metrics
-            species_counts = {}
-            for detection in detections:
-                species_name = detection.species.name if detection.species else 'Unknown'
-                species_counts[species_name] = species_counts.get(species_name, 0) + 1
-            
+            counts_array = self.biodiversity_analyzer._counts_array(species_counts)
+            shannon, simpson, evenness = self.biodiversity_analyzer.calculate_diversity_indices(counts_array)
             biodiversity_metrics = {
-                'shannon_index': self.biodiversity_analyzer.calculate_shannon_index(species_counts),
-                'simpson_index': self.biodiversity_analyzer.calculate_simpson_index(species_counts),
-                'species_richness': len([count for count in species_counts.values() if count > 0]),
-                'species_evenness': self.biodiversity_analyzer.calculate_species_evenness(species_counts),
-                'dominant_species': sorted(species_counts.items(), key=lambda x: x[1], reverse=True)[:3],
+                'shannon_index': shannon,
+                'simpson_index': simpson,
+                'species_richness': int(np.count_nonzero(counts_array > 0)),
+                'species_evenness': evenness,
+                'dominant_species': nlargest(3, species_counts.items(), key=itemgetter(1)),
                 'rare_species': [species for species, count in species_counts.items() if count == 1]
             }
             
-            # Analyze activity patterns
-            activity_patterns = self.activity_analyzer.analyze_temporal_patterns(detections)
+            # Species confidence anomalies are pre-filtered in the database
+            species_anomalies = []
+            if len(detections) >= 20:
+                species_anomalies = self.anomaly_detector.species_anomalies_from_candidates(
+                    self._species_anomaly_candidates(**filters), name_by_id=name_by_id
+                )
             
-            # Detect anomalies
-            temporal_anomalies = self.anomaly_detector.detect_temporal_anomalies(detections)
-            species_anomalies = self.anomaly_detector.detect_species_anomalies(detections)
-            
-            # Analyze population trends
-            population_trends = self.trend_analyzer.analyze_population_trends(detections)
+            # Activity patterns, temporal anomalies and population trends only
+            # read the already loaded detections, so run them concurrently (the
+            # heavy parts are NumPy/SciPy/scikit-learn calls that release the GIL)
+            with ThreadPoolExecutor(max_workers=self.ANALYZER_WORKERS) as executor:
+                activity_future = executor.submit(
+                    self.activity_analyzer.analyze_temporal_patterns, detections
+                )
+                temporal_future = executor.submit(
+                    self.anomaly_detector.detect_temporal_anomalies,
+                    detections, cache_key=organization_id
+                )
+                trends_future = executor.submit(
+                    self.trend_analyzer.analyze_population_trends,
+                    detections, name_by_id=name_by_id
+                )
+                
+                activity_patterns = activity_future.result()
+                temporal_anomalies = temporal_future.result()
+                population_trends = trends_future.result()
             
             # Generate conservation alerts
             conservation_alerts = self.conservation_system.generate_conservation_alerts(
@@ -546,8 +1014,8 @@ class EnhancedAnalyticsEngine:
                         'detection_count': count,
                         'percentage': (count / len(detections)) * 100 if detections else 0
                     }
-                    for species_name, count in sorted(species_counts.items(), 
-                                                    key=lambda x: x[1], reverse=True)
+                    for species_name, count in sorted(species_counts.items(),
+                                                    key=itemgetter(1), reverse=True)
                 ]
             }
             
@@ -560,29 +1028,29 @@ class EnhancedAnalyticsEngine:
         try:
             # Get recent detections (last 24 hours)
             start_time = datetime.utcnow() - timedelta(hours=24)
+            filters = {'organization_id': organization_id, 'start_date': start_time}
             
-            query = db.session.query(WildlifeDetection).join(CameraImage).join(Camera)
-            query = query.filter(CameraImage.timestamp >= start_time)
-            
-            if organization_id:
-                query = query.filter(Camera.organization_id == organization_id)
-            
-            recent_detections = query.all()
+            def load_insights():
+                # Quick biodiversity calculation, aggregated in the database
+                species_counts = Counter()
+                for species_id, species_name, count in self._species_counts(**filters):
+                    species_counts[species_name] += count
+                
+                recent_detections = sum(species_counts.values())
+                
+                return {
+                    'recent_detections': recent_detections,
+                    'active_species': len(species_counts),
+                    'biodiversity_index': self.biodiversity_analyzer.calculate_shannon_index(species_counts),
+                    'top_species': nlargest(5, species_counts.items(), key=itemgetter(1)),
+                    'activity_level': 'high' if recent_detections > 10 else 'moderate' if recent_detections > 3 else 'low'
+                }
             
-            # Quick biodiversity calculation
-            species_counts = {}
-            for detection in recent_detections:
-                species_name = detection.species.name if detection.species else 'Unknown'
-                species_counts[species_name] = species_counts.get(species_name, 0) + 1
+            key = INSIGHTS_CACHE_KEY.format(org_id=organization_id or 'all',
+                                            latest_id=self._latest_detection_id(**filters))
+            insights = cache.get_or_set(key, INSIGHTS_CACHE_TTL, load_insights)
             
-            return {
-                'timestamp': datetime.utcnow().isoformat(),
-                'recent_detections': len(recent_detections),
-                'active_species': len(species_counts),
-                'biodiversity_index': self.biodiversity_analyzer.calculate_shannon_index(species_counts),
-                'top_species': sorted(species_counts.items(), key=lambda x: x[1], reverse=True)[:5],
-                'activity_level': 'high' if len(recent_detections) > 10 else 'moderate' if len(recent_detections) > 3 else 'low'
-            }
+            return {'timestamp': datetime.utcnow().isoformat(), **insights}
             
         except Exception as e:
             self.logger.error(f"Error generating real-time insights: {str(e)}")
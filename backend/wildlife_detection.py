@@ -6,6 +6,10 @@ and custom species classification models.
 import os
 import json
 import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 from PIL import Image
@@ -20,19 +24,109 @@ except ImportError:
     TF_AVAILABLE = False
     logging.warning("TensorFlow not available - wildlife detection will use fallback methods")
 
+# OpenCV provides SIMD uint8 kernels for ROI statistics and resizing
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Files decoded with tf.io.decode_jpeg when MegaDetector is loaded
+JPEG_EXTENSIONS = {'.jpg', '.jpeg'}
+
+# Full-integer TFLite conversion of the SavedModel, stored beside it and
+# preferred when present (INT8 kernels: XNNPACK on hosts, CMSIS-NN on ESP32)
+INT8_TFLITE_SUFFIX = '_int8.tflite'
+
+# MegaDetector category id for animals
+ANIMAL_CLASS_ID = 1
+
+def _build_species_lut() -> np.ndarray:
+    """
+    Tabulate the simple species heuristics by size bin and color flags.
+    
+    Rows are size bins (0: <= 10000 px, 1: <= 50000 px, 2: larger);
+    columns are color codes reddish*8 + dark*4 + red_over_150*2 + light.
+    """
+    lut = np.empty((3, 16), dtype=object)
+    for color_code in range(16):
+        reddish, dark, red_over_150, light = (bool(color_code & bit) for bit in (8, 4, 2, 1))
+        
+        # Large: reddish/brown -> deer, dark -> bear, default large animal -> deer
+        lut[2, color_code] = 'deer' if reddish else 'bear' if dark else 'deer'
+        # Medium: reddish -> fox, otherwise raccoon
+        lut[1, color_code] = 'fox' if red_over_150 else 'raccoon'
+        # Small: light colored -> rabbit, otherwise bird
+        lut[0, color_code] = 'rabbit' if light else 'bird'
+    return lut
+
+SPECIES_LUT = _build_species_lut()
+
+@dataclass
+class Detections:
+    """
+    Detections for one image, stored as parallel arrays.
+    
+    boxes holds pixel [x, y, width, height] rows. Per-detection
+    dictionaries are only built by to_dicts() at the API boundary.
+    """
+    boxes: np.ndarray
+    scores: np.ndarray
+    class_ids: np.ndarray
+    species: List[str] = field(default_factory=list)
+    
+    @classmethod
+    def empty(cls) -> 'Detections':
+        return cls(np.empty((0, 4), dtype=int), np.empty(0, dtype=np.float32), np.empty(0, dtype=int))
+    
+    def __len__(self) -> int:
+        return len(self.scores)
+    
+    def select(self, mask: np.ndarray) -> 'Detections':
+        """Get the detections where mask is True."""
+        return Detections(self.boxes[mask], self.scores[mask], self.class_ids[mask])
+    
+    def to_dicts(self, scientific_names: Dict[str, str]) -> List[Dict]:
+        """Convert classified detections to API result dictionaries."""
+        timestamp = datetime.utcnow().isoformat()
+        return [
+            {
+                'species': species,
+                'confidence': confidence,
+                'bounding_box': {'x': x, 'y': y, 'width': w, 'height': h},
+                'scientific_name': scientific_names.get(species, ''),
+                'detection_timestamp': timestamp,
+                'model_version': 'megadetector_v5a',
+                'classification_method': 'simple_heuristic'
+            }
+            for species, confidence, (x, y, w, h) in zip(
+                self.species, self.scores.tolist(), self.boxes.tolist())
+        ]
+
 class WildlifeDetector:
     """
     Wildlife detection system integrating Microsoft MegaDetector
     and custom species classification models.
     """
     
+    # Loaded SavedModels shared by all detectors, keyed by model path, and
+    # their serving signatures traced per resolution, keyed by (path, H, W)
+    _MODEL_CACHE: Dict[str, object] = {}
+    _INFER_CACHE: Dict[Tuple[str, int, int], object] = {}
+    _MODEL_CACHE_LOCK = threading.Lock()
+    
     def __init__(self, model_path: str = None):
         self.model_path = model_path
         self.model = None
         self.species_classifier = None
         
+        # Signature runner when the INT8 TFLite model is used instead
+        self.tflite_runner = None
+        self.tflite_input_name = None
+        self.tflite_input_size = None
+        
         # MegaDetector categories
         self.megadetector_categories = {
             1: 'animal',
@@ -42,11 +136,20 @@ class WildlifeDetector:
         
         # Load species classification data
         self.species_mapping = self._load_species_mapping()
+        self._scientific_names = {
+            species: info.get('scientific_name', '')
+            for species, info in self.species_mapping.items()
+        }
         
         # Detection thresholds
         self.confidence_threshold = 0.2
         self.animal_confidence_threshold = 0.5
         
+        # Images per MegaDetector call in batch_process_images, and threads
+        # decoding upcoming images while a batch runs
+        self.batch_size = 8
+        self.decode_workers = os.cpu_count() or 1
+        
         # Initialize models
         self._initialize_models()
     
@@ -54,7 +157,11 @@ class WildlifeDetector:
         """Initialize detection models."""
         try:
             if TF_AVAILABLE and self.model_path and os.path.exists(self.model_path):
-                self._load_megadetector_model()
+                tflite_path = self._int8_tflite_path()
+                if os.path.exists(tflite_path):
+                    self._load_int8_tflite_model(tflite_path)
+                if not self.model:
+                    self._load_megadetector_model()
             else:
                 logger.warning("MegaDetector model not available - using fallback detection")
                 
@@ -66,8 +173,11 @@ class WildlifeDetector:
         try:
             logger.info(f"Loading MegaDetector model from {self.model_path}")
             
-            # Load saved model
-            self.model = tf.saved_model.load(self.model_path)
+            # Load saved model once per process
+            with self._MODEL_CACHE_LOCK:
+                if self.model_path not in self._MODEL_CACHE:
+                    self._MODEL_CACHE[self.model_path] = tf.saved_model.load(self.model_path)
+                self.model = self._MODEL_CACHE[self.model_path]
             self.infer = self.model.signatures['serving_default']
             
             logger.info("MegaDetector model loaded successfully")
@@ -76,6 +186,71 @@ class WildlifeDetector:
             logger.error(f"Failed to load MegaDetector model: {str(e)}")
             self.model = None
     
+    def _int8_tflite_path(self) -> str:
+        """Path of the INT8 TFLite model stored beside the SavedModel."""
+        return self.model_path.rstrip('/\\') + INT8_TFLITE_SUFFIX
+    
+    def _load_int8_tflite_model(self, tflite_path: str):
+        """Load the INT8 TFLite MegaDetector and its serving signature."""
+        try:
+            logger.info(f"Loading INT8 TFLite MegaDetector from {tflite_path}")
+            
+            interpreter = tf.lite.Interpreter(model_path=tflite_path)
+            self.tflite_runner = interpreter.get_signature_runner()
+            self.tflite_input_name, input_details = next(
+                iter(self.tflite_runner.get_input_details().items())
+            )
+            
+            # Resize inputs only when the converted model has a fixed size
+            height, width = input_details['shape_signature'][1:3]
+            self.tflite_input_size = (int(width), int(height)) if height > 0 and width > 0 else None
+            self.model = interpreter
+            
+            logger.info("INT8 TFLite MegaDetector loaded successfully")
+            
+        except Exception as e:
+            logger.error(f"Failed to load INT8 TFLite model: {str(e)}")
+            self.model = None
+            self.tflite_runner = None
+    
+    def convert_to_int8_tflite(self, calibration_image_paths: List[str],
+                               output_path: Optional[str] = None) -> str:
+        """
+        Convert the MegaDetector SavedModel to a full-integer TFLite model.
+        
+        Calibration images should be recent captures from the deployed
+        cameras (a few hundred, at the camera resolution) so activation
+        ranges match field conditions.
+        
+        Args:
+            calibration_image_paths: Images for the representative dataset
+            output_path: Where to write the model (default: beside the SavedModel)
+            
+        Returns:
+            Path of the written .tflite file
+        """
+        if not TF_AVAILABLE:
+            raise RuntimeError("TensorFlow is required for TFLite conversion")
+        
+        def representative_dataset():
+            for image_path in calibration_image_paths:
+                yield [self._load_and_preprocess_image(image_path)[np.newaxis, ...]]
+        
+        converter = tf.lite.TFLiteConverter.from_saved_model(self.model_path)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+        converter.inference_output_type = tf.float32
+        tflite_model = converter.convert()
+        
+        output_path = output_path or self._int8_tflite_path()
+        with open(output_path, 'wb') as f:
+            f.write(tflite_model)
+        
+        logger.info(f"INT8 TFLite model written to {output_path} ({len(tflite_model) / 1024 / 1024:.1f} MB)")
+        return output_path
+    
     def _load_species_mapping(self) -> Dict:
         """Load species classification mapping."""
         # Default species mapping - in production this would be loaded from database
@@ -139,29 +314,59 @@ class WildlifeDetector:
                 raise FileNotFoundError(f"Image file not found: {image_path}")
             
             # Load and preprocess image
-            image = self._load_and_preprocess_image(image_path)
+            image = self._load_detection_image(image_path)
             
             # Run detection
             if self.model:
                 detections = self._run_megadetector(image)
             else:
-                detections = self._run_fallback_detection(image_path)
+                detections = self._run_fallback_detection(image)
             
-            # Post-process and classify species
-            results = []
-            for detection in detections:
-                if detection['category'] == 'animal' and detection['confidence'] >= self.animal_confidence_threshold:
-                    # Classify species
-                    species_result = self._classify_species(image, detection)
-                    results.append(species_result)
-            
-            logger.info(f"Detected {len(results)} wildlife instances in {image_path}")
-            return results
+            return self._postprocess_detections(image_path, image, detections)
             
         except Exception as e:
             logger.error(f"Wildlife detection failed for {image_path}: {str(e)}")
             return []
     
+    def _postprocess_detections(self, image_path: str, image: np.ndarray,
+                                detections: Detections) -> List[Dict]:
+        """Keep confident animal detections and classify them to species."""
+        # Decoded tensors are viewed as arrays for ROI slicing (no copy on CPU)
+        image = np.asarray(image)
+        animals = detections.select(
+            (detections.class_ids == ANIMAL_CLASS_ID) &
+            (detections.scores >= self.animal_confidence_threshold)
+        )
+        
+        # Classify all regions of interest in one pass
+        animals.species = self._classify_species_batch(
+            [self._extract_roi(image, box) for box in animals.boxes.tolist()]
+        )
+        results = animals.to_dicts(self._scientific_names)
+        
+        logger.info(f"Detected {len(results)} wildlife instances in {image_path}")
+        return results
+    
+    def _load_detection_image(self, image_path: str):
+        """
+        Load an image for detection.
+        
+        With MegaDetector loaded, JPEGs are decoded straight into a tensor
+        with TensorFlow; other formats and the fallback path use PIL.
+        """
+        if self.model and os.path.splitext(image_path)[1].lower() in JPEG_EXTENSIONS:
+            return self._load_image_tf(image_path)
+        return self._load_and_preprocess_image(image_path)
+    
+    def _load_image_tf(self, image_path: str) -> 'tf.Tensor':
+        """Decode a JPEG into a uint8 [H, W, 3] tensor without a PIL/NumPy copy."""
+        try:
+            return tf.io.decode_jpeg(tf.io.read_file(image_path), channels=3,
+                                     dct_method='INTEGER_FAST')
+        except Exception as e:
+            logger.error(f"Failed to load image {image_path}: {str(e)}")
+            raise
+    
     def _load_and_preprocess_image(self, image_path: str) -> np.ndarray:
         """Load and preprocess image for detection."""
         try:
@@ -181,178 +386,265 @@ class WildlifeDetector:
             logger.error(f"Failed to load image {image_path}: {str(e)}")
             raise
     
-    def _run_megadetector(self, image: np.ndarray) -> List[Dict]:
+    def _run_megadetector(self, image: np.ndarray) -> Detections:
         """Run MegaDetector on preprocessed image."""
+        return self._run_megadetector_batch([image])[0]
+    
+    def _run_megadetector_batch(self, images: List[np.ndarray]) -> List[Detections]:
+        """
+        Run MegaDetector once on a batch of same-sized images.
+        
+        Args:
+            images: Preprocessed RGB image arrays, all with the same shape
+            
+        Returns:
+            Detections for each image, in input order
+        """
+        if self.tflite_runner:
+            return [self._run_tflite_detector(image) for image in images]
+        
         try:
-            # Prepare input tensor
-            input_tensor = tf.convert_to_tensor(image)
-            input_tensor = input_tensor[tf.newaxis, ...]
+            # Prepare input tensor [B, H, W, 3]; built per call so concurrent
+            # requests sharing this detector never see each other's images
+            input_tensor = tf.stack(images)
             
             # Run inference
-            detections = self.infer(input_tensor)
+            height, width = images[0].shape[:2]
+            detections = self._specialized_infer(height, width)(input_tensor)
             
-            # Extract results
-            results = []
-            
-            boxes = detections['detection_boxes'][0].numpy()
-            classes = detections['detection_classes'][0].numpy().astype(int)
-            scores = detections['detection_scores'][0].numpy()
-            
-            for i in range(len(boxes)):
-                if scores[i] >= self.confidence_threshold:
-                    category = self.megadetector_categories.get(classes[i], 'unknown')
-                    
-                    # Convert normalized coordinates to pixel coordinates
-                    height, width = image.shape[:2]
-                    ymin, xmin, ymax, xmax = boxes[i]
-                    
-                    results.append({
-                        'category': category,
-                        'confidence': float(scores[i]),
-                        'bounding_box': {
-                            'x': int(xmin * width),
-                            'y': int(ymin * height),
-                            'width': int((xmax - xmin) * width),
-                            'height': int((ymax - ymin) * height)
-                        }
-                    })
+            # Fetch boxes, classes and scores in a single device-to-host copy
+            outputs = tf.concat([
+                tf.cast(detections['detection_boxes'], tf.float32),
+                tf.cast(detections['detection_classes'], tf.float32)[..., tf.newaxis],
+                tf.cast(detections['detection_scores'], tf.float32)[..., tf.newaxis]
+            ], axis=-1).numpy()
+            boxes = outputs[..., :4]
+            classes = outputs[..., 4].astype(int)
+            scores = outputs[..., 5]
             
-            return results
+            # Extract results
+            return [
+                self._parse_detections(boxes[i], classes[i], scores[i], height, width)
+                for i in range(len(images))
+            ]
             
         except Exception as e:
             logger.error(f"MegaDetector inference failed: {str(e)}")
-            return []
+            return [Detections.empty() for _ in images]
     
-    def _run_fallback_detection(self, image_path: str) -> List[Dict]:
+    def _specialized_infer(self, height: int, width: int):
         """
-        Fallback detection method when MegaDetector is not available.
-        Uses simple heuristics and metadata analysis.
+        Get the serving signature traced for a fixed capture resolution.
+        
+        The SavedModel signature accepts any [B, H, W, 3] input; tracing it
+        once per resolution gives a concrete function with static spatial
+        dims, so calls skip signature dispatch and the graph is optimized
+        for the actual input shape. Traces are shared by every detector
+        using the same model, and cameras use a constant resolution, so
+        each model normally needs a single trace per process.
         """
+        key = (self.model_path, height, width)
+        with self._MODEL_CACHE_LOCK:
+            if key not in self._INFER_CACHE:
+                signature = self.infer
+                self._INFER_CACHE[key] = tf.function(
+                    lambda images: signature(images)
+                ).get_concrete_function(tf.TensorSpec([None, height, width, 3], tf.uint8))
+            return self._INFER_CACHE[key]
+    
+    def _run_tflite_detector(self, image: np.ndarray) -> Detections:
+        """Run the INT8 TFLite MegaDetector on one image."""
         try:
-            # Simple fallback - assume wildlife if motion was detected
-            # In production, this could use other CV techniques or API calls
+            image = np.asarray(image)
+            height, width = image.shape[:2]
             
-            # Load image to get dimensions
-            image = Image.open(image_path)
-            width, height = image.size
+            # Boxes are normalized, so resizing to the model input keeps them valid
+            model_input = image
+            if self.tflite_input_size and self.tflite_input_size != (width, height):
+                if CV2_AVAILABLE:
+                    model_input = cv2.resize(image, self.tflite_input_size, interpolation=cv2.INTER_LINEAR)
+                else:
+                    model_input = np.asarray(Image.fromarray(image).resize(self.tflite_input_size))
             
-            # Create a default detection covering most of the image
-            detection = {
-                'category': 'animal',
-                'confidence': 0.6,  # Lower confidence for fallback
-                'bounding_box': {
-                    'x': int(width * 0.1),
-                    'y': int(height * 0.1), 
-                    'width': int(width * 0.8),
-                    'height': int(height * 0.8)
-                }
-            }
+            detections = self.tflite_runner(**{self.tflite_input_name: model_input[np.newaxis, ...]})
             
-            logger.info("Using fallback detection method")
-            return [detection]
+            return self._parse_detections(
+                detections['detection_boxes'][0],
+                detections['detection_classes'][0].astype(int),
+                detections['detection_scores'][0],
+                height, width
+            )
             
         except Exception as e:
-            logger.error(f"Fallback detection failed: {str(e)}")
-            return []
+            logger.error(f"TFLite MegaDetector inference failed: {str(e)}")
+            return Detections.empty()
     
-    def _classify_species(self, image: np.ndarray, detection: Dict) -> Dict:
-        """
-        Classify detected animal to species level.
+    def _parse_detections(self, boxes: np.ndarray, classes: np.ndarray, scores: np.ndarray,
+                          height: int, width: int) -> Detections:
+        """Convert one image's raw MegaDetector outputs to pixel-space detections."""
+        keep = scores >= self.confidence_threshold
         
-        Args:
-            image: Full image array
-            detection: Detection dictionary with bounding box
-            
-        Returns:
-            Enhanced detection with species classification
+        # Convert normalized [ymin, xmin, ymax, xmax] to pixel [x, y, width, height]
+        ymin, xmin, ymax, xmax = boxes[keep].T
+        pixel_boxes = np.stack([
+            (xmin * width).astype(int),
+            (ymin * height).astype(int),
+            ((xmax - xmin) * width).astype(int),
+            ((ymax - ymin) * height).astype(int)
+        ], axis=1)
+        
+        return Detections(pixel_boxes, scores[keep], classes[keep])
+    
+    def _run_fallback_detection(self, image: np.ndarray) -> Detections:
+        """
+        Fallback detection method when MegaDetector is not available.
+        Uses simple heuristics and metadata analysis.
         """
         try:
-            # Extract region of interest
-            bbox = detection['bounding_box']
-            roi = image[bbox['y']:bbox['y']+bbox['height'], 
-                       bbox['x']:bbox['x']+bbox['width']]
+            # Simple fallback - assume wildlife if motion was detected
+            # In production, this could use other CV techniques or API calls
             
-            # Simple species classification (placeholder)
-            # In production, this would use a trained species classifier
-            species = self._simple_species_classification(roi)
+            # Dimensions come from the already decoded image, no second file read
+            height, width = image.shape[:2]
             
-            # Build result
-            result = {
-                'species': species,
-                'confidence': detection['confidence'],
-                'bounding_box': detection['bounding_box'],
-                'scientific_name': self.species_mapping.get(species, {}).get('scientific_name', ''),
-                'detection_timestamp': datetime.utcnow().isoformat(),
-                'model_version': 'megadetector_v5a',
-                'classification_method': 'simple_heuristic'
-            }
+            # Create a default detection covering most of the image
+            detection = Detections(
+                boxes=np.array([[int(width * 0.1), int(height * 0.1),
+                                 int(width * 0.8), int(height * 0.8)]]),
+                scores=np.array([0.6]),  # Lower confidence for fallback
+                class_ids=np.array([ANIMAL_CLASS_ID])
+            )
             
-            return result
+            logger.info("Using fallback detection method")
+            return detection
             
         except Exception as e:
-            logger.error(f"Species classification failed: {str(e)}")
-            return {
-                'species': 'unknown',
-                'confidence': detection['confidence'],
-                'bounding_box': detection['bounding_box'],
-                'scientific_name': '',
-                'detection_timestamp': datetime.utcnow().isoformat()
-            }
+            logger.error(f"Fallback detection failed: {str(e)}")
+            return Detections.empty()
+    
+    @staticmethod
+    def _extract_roi(image: np.ndarray, box: List[int]) -> np.ndarray:
+        """Extract a pixel [x, y, width, height] box region from the full image."""
+        x, y, w, h = box
+        return image[y:y+h, x:x+w]
     
     def _simple_species_classification(self, roi: np.ndarray) -> str:
         """
         Simple species classification based on basic image properties.
         This is a placeholder - in production use a trained classifier.
         """
+        return self._classify_species_batch([roi])[0]
+    
+    def _classify_species_batch(self, rois: List[np.ndarray]) -> List[str]:
+        """
+        Apply the simple species heuristics to several ROIs at once.
+        
+        Mean colors and sizes are gathered into arrays, reduced to a size
+        bin and color code per ROI, and mapped through SPECIES_LUT.
+        """
+        if not rois:
+            return []
+        
         try:
-            # Get basic image statistics
-            mean_color = np.mean(roi, axis=(0, 1))
-            roi_size = roi.shape[0] * roi.shape[1]
-            
-            # Simple heuristics based on color and size
-            if roi_size > 50000:  # Large animal
-                if mean_color[0] > mean_color[1] and mean_color[0] > mean_color[2]:
-                    return 'deer'  # Reddish/brown
-                elif np.mean(mean_color) < 80:
-                    return 'bear'  # Dark
-                else:
-                    return 'deer'  # Default large animal
-            elif roi_size > 10000:  # Medium animal
-                if mean_color[0] > 150:
-                    return 'fox'  # Reddish
-                else:
-                    return 'raccoon'
-            else:  # Small animal
-                if np.mean(mean_color) > 120:
-                    return 'rabbit'  # Light colored
-                else:
-                    return 'bird'
+            # Get basic image statistics (RGB order, as the ROIs are RGB)
+            if CV2_AVAILABLE:
+                mean_colors = np.array([cv2.mean(roi)[:3] for roi in rois])
+            else:
+                mean_colors = np.stack([np.mean(roi, axis=(0, 1)) for roi in rois])
+            roi_sizes = np.array([roi.shape[0] * roi.shape[1] for roi in rois])
+            brightness = mean_colors.mean(axis=1)
+            red, green, blue = mean_colors[:, 0], mean_colors[:, 1], mean_colors[:, 2]
+            
+            # Simple heuristics based on color and size, as a table lookup
+            size_bin = (roi_sizes > 50000).astype(int) + (roi_sizes > 10000)
+            color_code = (
+                ((red > green) & (red > blue)) * 8 +  # Reddish/brown
+                (brightness < 80) * 4 +               # Dark
+                (red > 150) * 2 +                     # Reddish
+                (brightness > 120)                    # Light colored
+            )
+            return SPECIES_LUT[size_bin, color_code].tolist()
             
         except Exception as e:
             logger.error(f"Simple classification failed: {str(e)}")
-            return 'unknown'
+            return ['unknown'] * len(rois)
     
     def batch_process_images(self, image_paths: List[str]) -> Dict[str, List[Dict]]:
         """
         Process multiple images in batch.
         
+        With MegaDetector loaded, images of the same size are stacked and
+        run through the model batch_size at a time.
+        
         Args:
             image_paths: List of image file paths
             
         Returns:
             Dictionary mapping image paths to detection results
         """
-        results = {}
+        if not self.model:
+            results = {}
+            for image_path in image_paths:
+                results[image_path] = self.detect_wildlife(image_path)
+            return results
+        
+        results = {image_path: [] for image_path in image_paths}
         
-        for image_path in image_paths:
+        # Images are decoded on worker threads (PIL releases the GIL) at most
+        # two batches ahead, while the main thread runs inference. Same-sized
+        # images are grouped so they can share a batch.
+        prefetch = 2 * self.batch_size
+        remaining = iter(image_paths)
+        pending = deque()
+        groups = {}
+        
+        with ThreadPoolExecutor(max_workers=self.decode_workers) as executor:
+            def submit_next():
+                image_path = next(remaining, None)
+                if image_path is not None:
+                    pending.append((image_path, executor.submit(self._load_image_for_batch, image_path)))
+            
+            for _ in range(prefetch):
+                submit_next()
+            
+            while pending:
+                image_path, future = pending.popleft()
+                submit_next()
+                
+                try:
+                    image = future.result()
+                except Exception as e:
+                    logger.error(f"Batch processing failed for {image_path}: {str(e)}")
+                    continue
+                
+                group = groups.setdefault(tuple(image.shape), [])
+                group.append((image_path, image))
+                if len(group) == self.batch_size:
+                    self._detect_batch(group, results)
+                    group.clear()
+        
+        # Run the remaining partial batches
+        for group in groups.values():
+            if group:
+                self._detect_batch(group, results)
+        
+        return results
+    
+    def _load_image_for_batch(self, image_path: str) -> np.ndarray:
+        """Load one image for batch_process_images (runs on a decode thread)."""
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+        return self._load_detection_image(image_path)
+    
+    def _detect_batch(self, batch: List[Tuple[str, np.ndarray]], results: Dict[str, List[Dict]]):
+        """Run one MegaDetector batch of same-sized images and store per-image results."""
+        batch_detections = self._run_megadetector_batch([image for _, image in batch])
+        
+        for (image_path, image), detections in zip(batch, batch_detections):
             try:
-                detections = self.detect_wildlife(image_path)
-                results[image_path] = detections
+                results[image_path] = self._postprocess_detections(image_path, image, detections)
             except Exception as e:
                 logger.error(f"Batch processing failed for {image_path}: {str(e)}")
-                results[image_path] = []
-        
-        return results
     
     def update_confidence_threshold(self, threshold: float):
         """Update detection confidence threshold."""
@@ -366,8 +658,29 @@ class WildlifeDetector:
         """Get information about loaded models."""
         return {
             'megadetector_loaded': self.model is not None,
+            'int8_tflite_loaded': self.tflite_runner is not None,
             'model_path': self.model_path,
             'tensorflow_available': TF_AVAILABLE,
             'confidence_threshold': self.confidence_threshold,
             'supported_species': list(self.species_mapping.keys())
-        }
\ No newline at end of file
+        }
+
+def warmup(model_path: str, image_size: Optional[Tuple[int, int]] = None) -> WildlifeDetector:
+    """
+    Create a detector so the model is loaded before the first request and,
+    when the capture resolution is known, run one dummy inference so the
+    serving function is traced for it too.
+    
+    Args:
+        model_path: Path to the MegaDetector SavedModel
+        image_size: Capture resolution (height, width) to trace for; if None,
+            tracing happens lazily on the first real image
+        
+    Returns:
+        The warmed-up detector
+    """
+    detector = WildlifeDetector(model_path)
+    if detector.model and image_size:
+        detector._run_megadetector(np.zeros(tuple(image_size) + (3,), dtype=np.uint8))
+        logger.info(f"MegaDetector warmed up for {image_size[1]}x{image_size[0]} input")
+    return detector
@@ -8,8 +8,13 @@ optimized for ESP32 microcontrollers with quantization and optimization.
 
 import os
 import json
+import math
+import hashlib
+import tempfile
 import argparse
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import numpy as np
 from typing import Dict, List, Optional, Tuple
@@ -22,6 +27,66 @@ import tensorflow_model_optimization as tfmot
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bytes per C++ array row in generated model data files
+CPP_BYTES_PER_ROW = 12
+
+# Model bytes formatted per write (whole rows), bounding peak memory
+CPP_WRITE_CHUNK_BYTES = CPP_BYTES_PER_ROW * 8192
+
+def _format_cpp_rows(data, bytes_per_row: int = CPP_BYTES_PER_ROW) -> bytes:
+    """
+    Format bytes as C++ array rows ("  0x1f, 0x8b, ...,\n").
+    
+    Hex digits come from bytes.hex() (C speed) and are dropped into
+    fixed-width "0xNN, " token slots of a NumPy character array, so no
+    Python code runs per byte.
+    """
+    hex_digits = np.frombuffer(data.hex().encode('ascii'), dtype=np.uint8).reshape(-1, 2)
+    byte_count = len(hex_digits)
+    row_count = -(-byte_count // bytes_per_row)
+    full_rows = byte_count // bytes_per_row
+    
+    # Indent each row, lay out "0x??, " tokens and end the row with ",\n"
+    lines = np.empty((row_count, 2 + bytes_per_row * 6), dtype=np.uint8)
+    lines[:, :2] = ord(' ')
+    tokens = lines[:, 2:].reshape(row_count, bytes_per_row, 6)
+    tokens[..., 0] = ord('0')
+    tokens[..., 1] = ord('x')
+    tokens[..., 4] = ord(',')
+    tokens[..., 5] = ord(' ')
+    tokens[:full_rows, :, 2:4] = hex_digits[:full_rows * bytes_per_row].reshape(full_rows, bytes_per_row, 2)
+    lines[:, -1] = ord('\n')
+    
+    # Fill and trim a partial last row
+    last_row_bytes = byte_count - full_rows * bytes_per_row
+    if last_row_bytes:
+        tokens[-1, :last_row_bytes, 2:4] = hex_digits[full_rows * bytes_per_row:]
+        last_line = lines[-1, :2 + last_row_bytes * 6].copy()
+        last_line[-1] = ord('\n')
+        return lines[:-1].tobytes() + last_line.tobytes()
+    
+    return lines.tobytes()
+
+# Bytes per element for TFLite tensor dtypes (others are counted as 4)
+TENSOR_TYPE_SIZES = {
+    np.float32: 4,
+    np.int8: 1,
+    np.uint8: 1,
+    np.int16: 2,
+    np.int32: 4,
+    np.float16: 2
+}
+
+# TFLM arena planning: buffers are 16-byte aligned, plus scratch/bookkeeping
+TENSOR_ARENA_ALIGNMENT = 16
+TENSOR_ARENA_OVERHEAD_BYTES = 2048
+
+# Targets without float16 kernels (f16 weights are dequantized to f32 at load)
+ESP32_TARGET_DEVICES = ('esp32', 'esp32s3')
+
+# Calibration samples for ESP-DL/ESP-NN integer-only conversion
+ESP_INT8_CALIBRATION_SAMPLES = 200
+
 class ESP32ModelConverter:
     """
     Convert TensorFlow models to TensorFlow Lite for ESP32 deployment.
@@ -38,6 +103,14 @@ class ESP32ModelConverter:
         self.model = None
         self.tflite_model = None
         self.model_info = {}
+        
+        # Interpreters for self.tflite_model by target platform, shared by
+        # analysis/benchmark/validation
+        self._interpreters = {}
+        self._tensor_details = None
+        
+        # XLA-compiled forward pass of self.model, traced on first use
+        self._tf_infer = None
     
     def load_model(self, model_path: str) -> keras.Model:
         """Load trained TensorFlow model."""
@@ -48,6 +121,7 @@ class ESP32ModelConverter:
         
         # Load model
         self.model = keras.models.load_model(model_path)
+        self._tf_infer = None
         
         # Get model info
         self.model_info = {
@@ -60,6 +134,80 @@ class ESP32ModelConverter:
         logger.info(f"Model loaded: {self.model_info}")
         return self.model
     
+    def prune_and_cluster(self, target_sparsity: float = 0.6, num_clusters: int = 16,
+                          fine_tune_data: Optional[tf.data.Dataset] = None,
+                          fine_tune_epochs: int = 2) -> keras.Model:
+        """
+        Prune and cluster model weights before conversion.
+        
+        Zeroed and shared weight values compress much further in the
+        .tflite than quantization alone. Pruning needs training steps to
+        apply its masks, so it is skipped when no fine-tuning data is given;
+        clustering works either way but recovers accuracy with fine-tuning.
+        
+        Args:
+            target_sparsity: Final fraction of pruned weights
+            num_clusters: Number of weight centroids per layer
+            fine_tune_data: Batched (images, one-hot labels) dataset
+            fine_tune_epochs: Epochs of fine-tuning for each step
+            
+        Returns:
+            Optimized model (also replaces the loaded model)
+        """
+        if not self.model:
+            raise ValueError("No model loaded. Call load_model() first.")
+        
+        model = self.model
+        
+        def fine_tune(model: keras.Model, callbacks: List = None):
+            model.compile(
+                optimizer=keras.optimizers.Adam(learning_rate=1e-5),
+                loss='categorical_crossentropy',
+                metrics=['accuracy']
+            )
+            model.fit(fine_tune_data, epochs=fine_tune_epochs, callbacks=callbacks or [], verbose=0)
+        
+        if fine_tune_data is not None:
+            logger.info(f"Pruning weights to {target_sparsity:.0%} sparsity...")
+            
+            steps_per_epoch = int(tf.data.experimental.cardinality(fine_tune_data))
+            end_step = fine_tune_epochs * steps_per_epoch if steps_per_epoch > 0 else 1000
+            
+            model = tfmot.sparsity.keras.prune_low_magnitude(
+                model,
+                pruning_schedule=tfmot.sparsity.keras.PolynomialDecay(
+                    initial_sparsity=0.0,
+                    final_sparsity=target_sparsity,
+                    begin_step=0,
+                    end_step=end_step
+                )
+            )
+            fine_tune(model, [tfmot.sparsity.keras.UpdatePruningStep()])
+            model = tfmot.sparsity.keras.strip_pruning(model)
+        else:
+            logger.warning("No fine-tuning data - skipping pruning, clustering only")
+        
+        logger.info(f"Clustering weights into {num_clusters} centroids...")
+        
+        model = tfmot.clustering.keras.cluster_weights(
+            model,
+            number_of_clusters=num_clusters,
+            cluster_centroids_init=tfmot.clustering.keras.CentroidInitialization.KMEANS_PLUS_PLUS,
+            preserve_sparsity=fine_tune_data is not None
+        )
+        if fine_tune_data is not None:
+            fine_tune(model)
+        model = tfmot.clustering.keras.strip_clustering(model)
+        
+        self.model = model
+        self._tf_infer = None
+        self.model_info['weight_optimization'] = {
+            'target_sparsity': target_sparsity if fine_tune_data is not None else 0.0,
+            'num_clusters': num_clusters
+        }
+        
+        return self.model
+    
     def create_representative_dataset(self, dataset_path: str = None, 
                                     num_samples: int = 100) -> callable:
         """
@@ -77,45 +225,90 @@ class ESP32ModelConverter:
         if dataset_path and os.path.exists(dataset_path):
             # Load real data for calibration
             import glob
-            from PIL import Image
             
             image_files = glob.glob(os.path.join(dataset_path, "**/*.jpg"), recursive=True)[:num_samples]
+            image_size = self.model_info['input_shape'][1:3]
             
-            def representative_data_gen():
-                for image_path in image_files:
-                    try:
-                        # Load and preprocess image
-                        image = Image.open(image_path).convert('RGB')
-                        image = image.resize(self.model_info['input_shape'][1:3])
-                        image = np.array(image, dtype=np.float32) / 255.0
-                        image = np.expand_dims(image, axis=0)
-                        yield [image]
-                    except Exception as e:
-                        logger.warning(f"Failed to process {image_path}: {e}")
-                        continue
+            def load_image(image_path):
+                image = tf.io.decode_jpeg(tf.io.read_file(image_path), channels=3)
+                return tf.image.resize(image, image_size) / 255.0
+            
+            cache_path = self._calibration_cache_path(image_files, image_size)
+            
+            if cache_path.exists():
+                # Preprocessed by an earlier conversion; read straight from the mmap
+                logger.info(f"Using cached calibration images: {cache_path}")
+                cached_images = np.load(cache_path, mmap_mode='r')
+                
+                def representative_data_gen():
+                    for i in range(len(cached_images)):
+                        yield [np.asarray(cached_images[i:i + 1])]
+            else:
+                # Decode and resize in parallel, overlapped with calibration;
+                # unreadable images are skipped as before
+                dataset = (
+                    tf.data.Dataset.from_tensor_slices(tf.constant(image_files, dtype=tf.string))
+                    .map(load_image, num_parallel_calls=tf.data.AUTOTUNE)
+                    .ignore_errors(log_warning=True)
+                    .batch(1)
+                    .prefetch(tf.data.AUTOTUNE)
+                )
+                
+                def representative_data_gen():
+                    images = np.empty((len(image_files),) + tuple(image_size) + (3,), dtype=np.float32)
+                    count = 0
+                    for image in dataset:
+                        images[count] = image[0]
+                        count += 1
+                        yield [images[count - 1:count]]
+                    
+                    # Cache for later conversions; rename so a partial file is never used
+                    partial_path = cache_path.with_name(f"{cache_path.stem}.partial.npy")
+                    np.save(partial_path, images[:count])
+                    os.replace(partial_path, cache_path)
         else:
             # Generate synthetic data for calibration
-            input_shape = self.model_info['input_shape']
+            sample_shape = (1,) + tuple(self.model_info['input_shape'][1:])
             
             def representative_data_gen():
+                # One buffer refilled per sample; the calibrator copies inputs
+                rng = np.random.default_rng()
+                sample = np.empty(sample_shape, dtype=np.float32)
                 for _ in range(num_samples):
                     # Generate random data matching input shape
-                    data = np.random.random((1,) + input_shape[1:]).astype(np.float32)
-                    yield [data]
+                    rng.random(out=sample, dtype=np.float32)
+                    yield [sample]
         
         return representative_data_gen
     
+    def _calibration_cache_path(self, image_files: List[str], image_size) -> Path:
+        """
+        Cache file for preprocessed calibration images.
+        
+        Keyed on the image files, their modification times and the input
+        size, so edited or replaced images are re-decoded.
+        """
+        key_source = '|'.join(
+            f"{image_file}:{os.path.getmtime(image_file)}" for image_file in image_files
+        ) + f"|{tuple(image_size)}"
+        key = hashlib.sha1(key_source.encode()).hexdigest()[:16]
+        return Path(tempfile.gettempdir()) / f"repds_{key}.npy"
+    
     def convert_to_tflite(self, 
                          quantization: str = 'dynamic',
                          dataset_path: str = None,
-                         optimization_target: str = 'size') -> bytes:
+                         optimization_target: str = 'size',
+                         target_device: str = 'esp32s3') -> bytes:
         """
         Convert model to TensorFlow Lite format.
         
         Args:
-            quantization: Quantization strategy ('none', 'dynamic', 'int8', 'float16')
+            quantization: Quantization strategy ('none', 'dynamic', 'int8', 'int8_esp',
+                'int16', 'float16')
             dataset_path: Path to calibration dataset
             optimization_target: Optimization target ('size', 'latency', 'accuracy')
+            target_device: Device the model is for ('esp32', 'esp32s3', 'host', 'gpu');
+                float16 is refused for ESP32 targets
             
         Returns:
             TensorFlow Lite model bytes
@@ -123,6 +316,12 @@ class ESP32ModelConverter:
         if not self.model:
             raise ValueError("No model loaded. Call load_model() first.")
         
+        if quantization == 'float16' and target_device in ESP32_TARGET_DEVICES:
+            raise ValueError(
+                f"float16 quantization is not accelerated on {target_device} (weights are "
+                "dequantized to float32 at load); use int8, int8_esp or int16 instead"
+            )
+        
         logger.info(f"Converting model with {quantization} quantization...")
         
         # Initialize converter
@@ -149,8 +348,33 @@ class ESP32ModelConverter:
             converter.inference_input_type = tf.int8
             converter.inference_output_type = tf.int8
             
+        elif quantization == 'int8_esp':
+            # Integer-only quantization for ESP-NN/ESP-DL kernels (the converter's
+            # default symmetric per-channel int8 weights), no float fallback ops;
+            # checked for leftover float tensors after conversion
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = self.create_representative_dataset(
+                dataset_path, num_samples=ESP_INT8_CALIBRATION_SAMPLES
+            )
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+            
+        elif quantization == 'int16':
+            # 16-bit activations with int8 weights (16x8), supported per-tensor
+            # by ESP32-S3 kernels; more accurate than int8 for sensitive layers
+            if target_device != 'esp32s3':
+                logger.warning(f"int16 activation quantization is aimed at esp32s3, not {target_device}")
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = self.create_representative_dataset(dataset_path)
+            converter.target_spec.supported_ops = [
+                tf.lite.OpsSet.EXPERIMENTAL_TFLITE_BUILTINS_ACTIVATIONS_INT16_WEIGHTS_INT8
+            ]
+            converter.inference_input_type = tf.int16
+            converter.inference_output_type = tf.int16
+            
         elif quantization == 'float16':
-            # Float16 quantization
+            # Float16 quantization (GPU delegate targets)
             converter.optimizations = [tf.lite.Optimize.DEFAULT]
             converter.target_spec.supported_types = [tf.float16]
             
@@ -164,7 +388,18 @@ class ESP32ModelConverter:
         
         # Convert model
         try:
-            self.tflite_model = converter.convert()
+            tflite_model = converter.convert()
+            
+            # Parse and plan the new model once; later analysis, benchmark
+            # and validation reuse this interpreter and its tensor details
+            interpreter = self._create_interpreter(tflite_model)
+            tensor_details = interpreter.get_tensor_details()
+            if quantization == 'int8_esp':
+                self._check_integer_only(tensor_details)
+            
+            self.tflite_model = tflite_model
+            self._interpreters = {'host': interpreter}
+            self._tensor_details = tensor_details
             logger.info("Model conversion successful")
             
             # Update model info
@@ -182,6 +417,81 @@ class ESP32ModelConverter:
         
         return self.tflite_model
     
+    def _check_integer_only(self, tensor_details: List[Dict]):
+        """Raise if a converted model still contains float32 tensors."""
+        float_tensors = [
+            tensor['name'] for tensor in tensor_details
+            if tensor['dtype'] == np.float32
+        ]
+        
+        if float_tensors:
+            raise ValueError(
+                f"Model is not integer-only; {len(float_tensors)} float32 tensors remain "
+                f"(e.g. {', '.join(float_tensors[:5])})"
+            )
+    
+    @staticmethod
+    def _create_interpreter(tflite_model: bytes, target_platform: str = 'host') -> tf.lite.Interpreter:
+        """
+        Create and allocate an interpreter for a TFLite model.
+        
+        'host' runs multithreaded with the default XNNPACK delegate; 'esp32'
+        runs single-threaded on the builtin kernels, closer to how the
+        device's reference/CMSIS-NN kernels scale.
+        """
+        if target_platform == 'esp32':
+            interpreter = tf.lite.Interpreter(
+                model_content=tflite_model,
+                num_threads=1,
+                experimental_op_resolver_type=(
+                    tf.lite.experimental.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+                )
+            )
+        else:
+            interpreter = tf.lite.Interpreter(
+                model_content=tflite_model,
+                num_threads=os.cpu_count() or 1
+            )
+        interpreter.allocate_tensors()
+        return interpreter
+    
+    def _get_interpreter(self, target_platform: str = 'host') -> tf.lite.Interpreter:
+        """Get the interpreter for the current TFLite model, creating it on first use."""
+        if target_platform not in self._interpreters:
+            self._interpreters[target_platform] = self._create_interpreter(self.tflite_model, target_platform)
+        return self._interpreters[target_platform]
+    
+    def _get_tensor_details(self) -> List[Dict]:
+        """Get the current TFLite model's tensor details, fetched once."""
+        if self._tensor_details is None:
+            self._tensor_details = self._get_interpreter().get_tensor_details()
+        return self._tensor_details
+    
+    def build(self, quantization: str = 'dynamic', dataset_path: str = None,
+              optimization_target: str = 'size', target_device: str = 'esp32s3',
+              benchmark: bool = False, benchmark_target: str = 'host') -> bytes:
+        """
+        Convert, analyze for ESP32 and optionally benchmark in one pass.
+        
+        All steps share the interpreter and tensor details created right
+        after conversion, so the FlatBuffer is parsed and planned once.
+        
+        Returns:
+            TensorFlow Lite model bytes
+        """
+        self.convert_to_tflite(
+            quantization=quantization,
+            dataset_path=dataset_path,
+            optimization_target=optimization_target,
+            target_device=target_device
+        )
+        self.optimize_for_esp32()
+        
+        if benchmark:
+            self.benchmark_model(target_platform=benchmark_target)
+        
+        return self.tflite_model
+    
     def optimize_for_esp32(self) -> bytes:
         """Apply ESP32-specific optimizations."""
         if not self.tflite_model:
@@ -190,8 +500,7 @@ class ESP32ModelConverter:
         logger.info("Applying ESP32-specific optimizations...")
         
         # Load the model for analysis
-        interpreter = tf.lite.Interpreter(model_content=self.tflite_model)
-        interpreter.allocate_tensors()
+        interpreter = self._get_interpreter()
         
         # Get model details
         input_details = interpreter.get_input_details()
@@ -207,9 +516,12 @@ class ESP32ModelConverter:
         if model_size_kb > max_model_size_kb:
             logger.warning(f"Model size ({model_size_kb:.1f} KB) exceeds ESP32 recommendation ({max_model_size_kb} KB)")
         
-        # Estimate tensor arena size
-        tensor_arena_size = self._estimate_tensor_arena_size(interpreter)
-        tensor_arena_kb = tensor_arena_size / 1024
+        # Estimate tensor arena size on the builtin-kernel plan the MCU runs,
+        # not the host interpreter whose node list includes XNNPACK nodes
+        persistent_arena_size, scratch_arena_size = self._estimate_tensor_arena_size(
+            self._get_interpreter('esp32')
+        )
+        tensor_arena_kb = (persistent_arena_size + scratch_arena_size) / 1024
         
         if tensor_arena_kb > max_tensor_arena_kb:
             logger.warning(f"Estimated tensor arena ({tensor_arena_kb:.1f} KB) may exceed ESP32 capacity")
@@ -217,83 +529,138 @@ class ESP32ModelConverter:
         self.model_info.update({
             'esp32_compatible': model_size_kb <= max_model_size_kb and tensor_arena_kb <= max_tensor_arena_kb,
             'estimated_tensor_arena_kb': tensor_arena_kb,
+            'estimated_persistent_arena_bytes': persistent_arena_size,
+            'estimated_scratch_arena_bytes': scratch_arena_size,
             'input_details': input_details,
             'output_details': output_details
         })
         
         return self.tflite_model
     
-    def _estimate_tensor_arena_size(self, interpreter) -> int:
-        """Estimate tensor arena size requirements."""
-        # Get tensor details
-        tensor_details = interpreter.get_tensor_details()
+    def _estimate_tensor_arena_size(self, interpreter) -> Tuple[int, int]:
+        """
+        Estimate tensor arena size requirements.
+        
+        The arena only holds activations, and TFLM reuses a buffer once
+        every op reading it has run. Ops are replayed in execution order,
+        allocating outputs and freeing tensors after their last consumer,
+        and the peak of live bytes is the scratch (non-persistent) size.
+        Weights are constant tensors kept in flash and are not counted.
+        The persistent part holds quantization parameters and runtime
+        bookkeeping that live for the interpreter's lifetime.
+        
+        The op list comes from the interpreter's private _get_ops_details();
+        if that is unavailable the scratch size falls back to the sum of all
+        tensors plus 30%, a conservative upper bound.
+        
+        Args:
+            interpreter: Interpreter without delegates, so its nodes are the
+                model's own operators in execution order
         
-        total_size = 0
+        Returns:
+            (persistent_bytes, scratch_bytes)
+        """
+        tensor_details = self._get_tensor_details()
+        
+        # Aligned size of every tensor, indexed by tensor index
+        tensor_bytes = {}
         for tensor in tensor_details:
-            if tensor['shape'].size > 0:  # Skip scalar tensors
-                tensor_size = np.prod(tensor['shape']) * self._get_type_size(tensor['dtype'])
-                total_size += tensor_size
+            size = math.prod(tensor['shape'].tolist()) * self._get_type_size(tensor['dtype'])
+            tensor_bytes[tensor['index']] = -(-size // TENSOR_ARENA_ALIGNMENT) * TENSOR_ARENA_ALIGNMENT
+        
+        # Per-channel scale (float32) and zero point (int32) for every tensor
+        quantization_bytes = sum(
+            8 * len(tensor['quantization_parameters']['scales']) for tensor in tensor_details
+        )
+        persistent_bytes = int(quantization_bytes + TENSOR_ARENA_OVERHEAD_BYTES)
         
-        # Add overhead (approximately 20-30%)
-        total_size = int(total_size * 1.3)
+        try:
+            ops = interpreter._get_ops_details()
+        except AttributeError:
+            logger.warning("Interpreter has no op details; using a whole-model tensor arena estimate")
+            return persistent_bytes, int(sum(tensor_bytes.values()) * 1.3)
+        
+        graph_inputs = {detail['index'] for detail in interpreter.get_input_details()}
+        graph_outputs = {detail['index'] for detail in interpreter.get_output_details()}
+        
+        # Last op reading each tensor; graph outputs stay live to the end
+        last_use = {}
+        for position, op in enumerate(ops):
+            for index in op['inputs']:
+                last_use[index] = position
+        for index in graph_outputs:
+            last_use[index] = len(ops)
+        
+        live = set(graph_inputs)
+        live_bytes = sum(tensor_bytes[index] for index in live)
+        peak_bytes = live_bytes
+        
+        for position, op in enumerate(ops):
+            # Inputs and outputs of an op are live at the same time
+            for index in op['outputs']:
+                if index >= 0 and index not in live:
+                    live.add(index)
+                    live_bytes += tensor_bytes[index]
+            peak_bytes = max(peak_bytes, live_bytes)
+            
+            for index in [index for index in live if last_use.get(index, -1) <= position]:
+                live.remove(index)
+                live_bytes -= tensor_bytes[index]
         
-        return total_size
+        return persistent_bytes, int(peak_bytes)
     
     def _get_type_size(self, dtype) -> int:
         """Get size of data type in bytes."""
-        type_sizes = {
-            np.float32: 4,
-            np.int8: 1,
-            np.uint8: 1,
-            np.int16: 2,
-            np.int32: 4,
-            np.float16: 2
-        }
-        return type_sizes.get(dtype, 4)  # Default to 4 bytes
+        return TENSOR_TYPE_SIZES.get(dtype, 4)  # Default to 4 bytes
     
-    def benchmark_model(self, num_runs: int = 100) -> Dict:
-        """Benchmark TFLite model performance."""
+    def benchmark_model(self, num_runs: int = 100, target_platform: str = 'host') -> Dict:
+        """
+        Benchmark TFLite model performance.
+        
+        Args:
+            num_runs: Number of timed inferences
+            target_platform: 'host' for multithreaded XNNPACK throughput,
+                'esp32' for single-threaded builtin kernels
+        """
         if not self.tflite_model:
             raise ValueError("No TFLite model available. Convert model first.")
         
-        logger.info(f"Benchmarking model performance ({num_runs} runs)...")
+        logger.info(f"Benchmarking model performance ({num_runs} runs, {target_platform} kernels)...")
         
         # Initialize interpreter
-        interpreter = tf.lite.Interpreter(model_content=self.tflite_model)
-        interpreter.allocate_tensors()
+        interpreter = self._get_interpreter(target_platform)
         
         input_details = interpreter.get_input_details()
         output_details = interpreter.get_output_details()
         
         # Prepare random input
+        input_index = input_details[0]['index']
         input_shape = input_details[0]['shape']
         input_data = np.random.random(input_shape).astype(np.float32)
         
         # Warm up
         for _ in range(10):
-            interpreter.set_tensor(input_details[0]['index'], input_data)
+            interpreter.set_tensor(input_index, input_data)
             interpreter.invoke()
         
-        # Benchmark
-        import time
-        times = []
+        # Benchmark, timed in integer nanoseconds
+        times_ns = np.empty(num_runs, dtype=np.int64)
         
-        for _ in range(num_runs):
-            start_time = time.time()
-            interpreter.set_tensor(input_details[0]['index'], input_data)
+        for i in range(num_runs):
+            start_time = time.perf_counter_ns()
+            interpreter.set_tensor(input_index, input_data)
             interpreter.invoke()
-            end_time = time.time()
-            
-            times.append((end_time - start_time) * 1000)  # Convert to milliseconds
+            times_ns[i] = time.perf_counter_ns() - start_time
         
         # Calculate statistics
-        times = np.array(times)
+        times = times_ns / 1e6  # Convert to milliseconds
         benchmark_results = {
             'avg_inference_time_ms': float(np.mean(times)),
             'min_inference_time_ms': float(np.min(times)),
             'max_inference_time_ms': float(np.max(times)),
             'std_inference_time_ms': float(np.std(times)),
-            'throughput_fps': float(1000 / np.mean(times))
+            'throughput_fps': float(1000 / np.mean(times)),
+            'target_platform': target_platform
         }
         
         logger.info(f"Average inference time: {benchmark_results['avg_inference_time_ms']:.2f} ms")
@@ -303,8 +670,18 @@ class ESP32ModelConverter:
         
         return benchmark_results
     
-    def generate_cpp_header(self, output_path: str, array_name: str = "wildlife_model") -> str:
-        """Generate C++ header file for ESP32 deployment."""
+    def generate_cpp_header(self, output_path: str, array_name: str = "wildlife_model",
+                            embed: str = 'array') -> str:
+        """
+        Generate C++ header file for ESP32 deployment.
+        
+        Args:
+            output_path: Path of the .h file
+            array_name: Prefix of the model data symbols
+            embed: 'array' writes the model as a hex C++ array (.cpp);
+                'incbin' writes a short assembly file (.S) that links the
+                .tflite in directly, avoiding megabytes of generated source
+        """
         if not self.tflite_model:
             raise ValueError("No TFLite model available. Convert model first.")
         
@@ -323,11 +700,13 @@ class ESP32ModelConverter:
 #ifndef WILDLIFE_MODEL_H
 #define WILDLIFE_MODEL_H
 
+#include <stddef.h>
 #include <stdint.h>
 
-// Model data
-extern const unsigned char {array_name}_data[];
-extern const int {array_name}_data_len;
+// Model data, 16-byte aligned in flash (.rodata.embedded, which the default
+// ESP-IDF linker script maps to flash through its .rodata.* rule)
+extern const unsigned char {array_name}_data[] __attribute__((aligned(16)));
+extern const size_t {array_name}_data_len;
 
 // Model configuration 
 #define MODEL_INPUT_WIDTH {self.model_info['input_shape'][2]}
@@ -336,6 +715,13 @@ extern const int {array_name}_data_len;
 #define MODEL_OUTPUT_SIZE {self.model_info['output_shape'][1]}
 #define MODEL_TENSOR_ARENA_SIZE {int(self.model_info.get('estimated_tensor_arena_kb', 200) * 1024)}
 
+// Tensor arena split for two-arena setups. Persistent buffers live for the
+// interpreter's lifetime and tolerate PSRAM (EXT_RAM_ATTR); scratch buffers
+// hold activations touched by every op and belong in internal DRAM (default
+// attributes). Their sum is MODEL_TENSOR_ARENA_SIZE.
+#define MODEL_PERSISTENT_ARENA_BYTES {self.model_info.get('estimated_persistent_arena_bytes', 0)}
+#define MODEL_SCRATCH_ARENA_BYTES {self.model_info.get('estimated_scratch_arena_bytes', int(self.model_info.get('estimated_tensor_arena_kb', 200) * 1024))}
+
 // Model metadata
 #define MODEL_VERSION "1.0.0"
 #define MODEL_SIZE_BYTES {len(self.tflite_model)}
@@ -351,9 +737,12 @@ extern const int {array_name}_data_len;
         with open(output_path, 'w') as f:
             f.write(header_content)
         
-        # Generate corresponding .cpp file with model data
-        cpp_path = output_path.replace('.h', '.cpp')
-        self._generate_cpp_data_file(cpp_path, array_name)
+        # Generate corresponding data file with model bytes
+        if embed == 'incbin':
+            self._generate_incbin_data_file(str(Path(output_path).with_suffix('.S')), array_name)
+        else:
+            cpp_path = str(Path(output_path).with_suffix('.cpp'))
+            self._generate_cpp_data_file(cpp_path, array_name)
         
         return output_path
     
@@ -361,66 +750,130 @@ extern const int {array_name}_data_len;
         """Generate C++ data file with model bytes."""
         logger.info(f"Generating C++ data file: {output_path}")
         
-        # Convert model bytes to C++ array
-        model_bytes = list(self.tflite_model)
-        
-        cpp_content = f"""/*
+        cpp_header = f"""/*
  * TensorFlow Lite model data for ESP32 Wildlife Camera
  * Generated automatically - do not edit manually
  */
 
 #include "{Path(output_path).stem.replace('_data', '')}.h"
 
-// Model data array
-const unsigned char {array_name}_data[] = {{
+// Model data array, aligned for ESP-NN 128-bit SIMD loads and kept in flash
+alignas(16) const unsigned char {array_name}_data[] __attribute__((section(".rodata.embedded"))) = {{
 """
         
-        # Write bytes in rows of 12 for readability
-        for i in range(0, len(model_bytes), 12):
-            row = model_bytes[i:i+12]
-            row_str = ', '.join(f'0x{b:02x}' for b in row)
-            cpp_content += f"  {row_str},\n"
-        
-        cpp_content += f"""
+        cpp_footer = f"""
 }};
 
 // Model data length
-const int {array_name}_data_len = {len(model_bytes)};
+const size_t {array_name}_data_len = {len(self.tflite_model)};
+"""
+        
+        # Write data file, with bytes in rows of 12 for readability,
+        # formatting one chunk of the model at a time
+        model_view = memoryview(self.tflite_model)
+        with open(output_path, 'wb', buffering=1 << 20) as f:
+            f.write(cpp_header.encode())
+            for start in range(0, len(model_view), CPP_WRITE_CHUNK_BYTES):
+                f.write(_format_cpp_rows(model_view[start:start + CPP_WRITE_CHUNK_BYTES]))
+            f.write(cpp_footer.encode())
+    
+    def _generate_incbin_data_file(self, output_path: str, array_name: str):
+        """Generate assembly file embedding the .tflite with .incbin."""
+        logger.info(f"Generating assembly data file: {output_path}")
+        
+        # The binary sits beside the .S file, which references it by name;
+        # compare contents, since a re-quantized model can keep the same size
+        tflite_path = Path(output_path).with_suffix('.tflite')
+        if not tflite_path.exists() or tflite_path.read_bytes() != self.tflite_model:
+            self._write_tflite(tflite_path)
+        
+        asm_content = f"""/*
+ * TensorFlow Lite model data for ESP32 Wildlife Camera
+ * Generated automatically - do not edit manually
+ *
+ * Embeds {tflite_path.name} directly; its directory must be on the
+ * assembler include path (e.g. the component's INCLUDE_DIRS).
+ */
+
+    .section .rodata.embedded
+    .global {array_name}_data
+    .balign 16
+{array_name}_data:
+    .incbin "{tflite_path.name}"
+{array_name}_data_end:
+
+    .global {array_name}_data_len
+    .balign 4
+{array_name}_data_len:
+    .int {array_name}_data_end - {array_name}_data
 """
         
-        # Write data file
         with open(output_path, 'w') as f:
-            f.write(cpp_content)
+            f.write(asm_content)
+    
+    def _write_tflite(self, tflite_path: Path):
+        """Write the TFLite model bytes."""
+        with open(tflite_path, 'wb') as f:
+            f.write(self.tflite_model)
+        
+        logger.info(f"TFLite model saved to: {tflite_path}")
+    
+    def _write_metadata(self, metadata_path: Path):
+        """Write model info as JSON."""
+        with open(metadata_path, 'w') as f:
+            json.dump(self.model_info, f, indent=2, default=str)
     
-    def save_model(self, output_path: str, generate_cpp: bool = True) -> str:
-        """Save TFLite model and metadata."""
+    def save_model(self, output_path: str, generate_cpp: bool = True,
+                   embed: str = 'array') -> str:
+        """
+        Save TFLite model and metadata.
+        
+        The .tflite, .json and C++ files are written concurrently; file
+        writes release the GIL, so the disk I/O overlaps.
+        """
         if not self.tflite_model:
             raise ValueError("No TFLite model available. Convert model first.")
         
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Save TFLite model
         tflite_path = output_path.with_suffix('.tflite')
-        with open(tflite_path, 'wb') as f:
-            f.write(self.tflite_model)
-        
-        logger.info(f"TFLite model saved to: {tflite_path}")
-        
-        # Save model metadata
         metadata_path = output_path.with_suffix('.json')
-        with open(metadata_path, 'w') as f:
-            json.dump(self.model_info, f, indent=2, default=str)
         
-        # Generate C++ files if requested
-        if generate_cpp:
-            cpp_header = output_path.with_suffix('.h')
-            self.generate_cpp_header(str(cpp_header))
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            # Save TFLite model and model metadata
+            futures = [
+                executor.submit(self._write_tflite, tflite_path),
+                executor.submit(self._write_metadata, metadata_path)
+            ]
+            
+            # Generate C++ files if requested
+            if generate_cpp:
+                cpp_header = output_path.with_suffix('.h')
+                tflite_written = futures[0]
+                
+                def write_cpp_files():
+                    # An .incbin .S embeds the .tflite written above, so wait for it
+                    if embed == 'incbin':
+                        tflite_written.result()
+                    self.generate_cpp_header(str(cpp_header), embed=embed)
+                
+                futures.append(executor.submit(write_cpp_files))
+            
+            # Surface any write error
+            for future in futures:
+                future.result()
         
         return str(tflite_path)
     
-    def validate_conversion(self, test_input: np.ndarray = None) -> Dict:
-        """Validate TFLite model against original model."""
+    def validate_conversion(self, test_input: np.ndarray = None, n_samples: int = 32) -> Dict:
+        """
+        Validate TFLite model against original model.
+        
+        Args:
+            test_input: Batch of inputs to compare on (default: n_samples random inputs)
+            n_samples: Number of random inputs when test_input is not given
+        """
         if not self.model or not self.tflite_model:
             raise ValueError("Both original and TFLite models must be available")
         
@@ -429,29 +882,54 @@ const int {array_name}_data_len = {len(model_bytes)};
         # Prepare test input
         if test_input is None:
             input_shape = self.model_info['input_shape']
-            test_input = np.random.random((1,) + input_shape[1:]).astype(np.float32)
+            test_input = np.random.random((n_samples,) + tuple(input_shape[1:])).astype(np.float32)
         
-        # Original model prediction
-        original_output = self.model.predict(test_input, verbose=0)
-        
-        # TFLite model prediction
-        interpreter = tf.lite.Interpreter(model_content=self.tflite_model)
-        interpreter.allocate_tensors()
-        
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
-        
-        interpreter.set_tensor(input_details[0]['index'], test_input)
-        interpreter.invoke()
-        tflite_output = interpreter.get_tensor(output_details[0]['index'])
+        # Original model prediction, one compiled forward pass for the whole batch
+        model = self.model
+        if self._tf_infer is None:
+            self._tf_infer = tf.function(lambda x: model(x, training=False), jit_compile=True)
+        try:
+            original_output = self._tf_infer(tf.constant(test_input)).numpy()
+        except tf.errors.OpError as e:
+            # No XLA on this host, or an op XLA cannot compile
+            logger.warning(f"XLA compilation failed, validating without it: {str(e)}")
+            self._tf_infer = tf.function(lambda x: model(x, training=False), jit_compile=False)
+            original_output = self._tf_infer(tf.constant(test_input)).numpy()
+        
+        # TFLite model prediction, one sample at a time at the converted batch size
+        interpreter = self._get_interpreter()
+        
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+        input_scale, input_zero_point = input_details['quantization']
+        output_scale, output_zero_point = output_details['quantization']
+        
+        tflite_output = np.empty_like(original_output)
+        for i in range(len(test_input)):
+            sample = test_input[i:i + 1]
+            if input_scale:
+                # Integer-input models take quantized values
+                limits = np.iinfo(input_details['dtype'])
+                sample = np.clip(np.round(sample / input_scale + input_zero_point),
+                                 limits.min, limits.max).astype(input_details['dtype'])
+            interpreter.set_tensor(input_details['index'], sample)
+            interpreter.invoke()
+            output = interpreter.get_tensor(output_details['index'])
+            if output_scale:
+                output = (output.astype(np.float32) - output_zero_point) * output_scale
+            tflite_output[i] = output[0]
         
         # Compare outputs
-        max_diff = np.max(np.abs(original_output - tflite_output))
-        mean_diff = np.mean(np.abs(original_output - tflite_output))
+        abs_diff = np.abs(original_output - tflite_output)
+        max_diff = np.max(abs_diff)
+        mean_diff = np.mean(abs_diff)
+        sample_max_diff = abs_diff.max(axis=tuple(range(1, abs_diff.ndim)))
         correlation = np.corrcoef(original_output.flatten(), tflite_output.flatten())[0, 1]
         
         validation_results = {
+            'samples': len(test_input),
             'max_difference': float(max_diff),
+            'sample_max_differences': sample_max_diff.tolist(),
             'mean_difference': float(mean_diff),
             'correlation': float(correlation),
             'validation_passed': max_diff < 0.1  # Threshold for acceptable difference
@@ -467,14 +945,25 @@ def main():
     parser.add_argument('model_path', type=str, help='Path to trained TensorFlow model')
     parser.add_argument('--output', '-o', type=str, required=True, help='Output path for TFLite model')
     parser.add_argument('--quantization', '-q', type=str, default='dynamic',
-                       choices=['none', 'dynamic', 'int8', 'float16'],
+                       choices=['none', 'dynamic', 'int8', 'int8_esp', 'int16', 'float16'],
                        help='Quantization strategy')
+    parser.add_argument('--target-device', type=str, default='esp32s3',
+                       choices=['esp32', 'esp32s3', 'host', 'gpu'],
+                       help='Target device (float16 is only allowed for host/gpu)')
     parser.add_argument('--dataset', '-d', type=str, help='Path to calibration dataset')
+    parser.add_argument('--cluster', type=int, metavar='N',
+                       help='Cluster weights into N centroids before conversion')
     parser.add_argument('--optimization', type=str, default='size',
                        choices=['size', 'latency', 'accuracy'],
                        help='Optimization target')
     parser.add_argument('--benchmark', action='store_true', help='Run performance benchmark')
+    parser.add_argument('--benchmark-target', type=str, default='host',
+                       choices=['host', 'esp32'],
+                       help='Benchmark with host (XNNPACK, all cores) or ESP32-like single-thread kernels')
     parser.add_argument('--cpp', action='store_true', default=True, help='Generate C++ header files')
+    parser.add_argument('--embed', type=str, default='array',
+                       choices=['array', 'incbin'],
+                       help='Embed model data as a C++ hex array or via .incbin in an assembly file')
     parser.add_argument('--validate', action='store_true', help='Validate conversion accuracy')
     
     args = parser.parse_args()
@@ -486,20 +975,20 @@ def main():
         # Load model
         converter.load_model(args.model_path)
         
-        # Convert to TFLite
-        tflite_model = converter.convert_to_tflite(
+        # Cluster weights before quantization if requested
+        if args.cluster:
+            converter.prune_and_cluster(num_clusters=args.cluster)
+        
+        # Convert to TFLite, apply ESP32 optimizations and benchmark if requested
+        tflite_model = converter.build(
             quantization=args.quantization,
             dataset_path=args.dataset,
-            optimization_target=args.optimization
+            optimization_target=args.optimization,
+            target_device=args.target_device,
+            benchmark=args.benchmark,
+            benchmark_target=args.benchmark_target
         )
         
-        # Apply ESP32 optimizations
-        converter.optimize_for_esp32()
-        
-        # Run benchmark if requested
-        if args.benchmark:
-            converter.benchmark_model()
-        
         # Validate conversion if requested
         if args.validate:
             validation_results = converter.validate_conversion()
@@ -507,7 +996,7 @@ def main():
                 logger.warning("Validation failed - model outputs differ significantly")
         
         # Save model
-        output_path = converter.save_model(args.output, generate_cpp=args.cpp)
+        output_path = converter.save_model(args.output, generate_cpp=args.cpp, embed=args.embed)
         
         logger.info("Model conversion completed successfully!")
         logger.info(f"Output saved to: {output_path}")
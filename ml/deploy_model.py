@@ -16,13 +16,59 @@ import shutil
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
 import hashlib
+import mmap
 import zipfile
+import numpy as np
 import requests
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Model bytes per line of the generated string literal
+STRING_LITERAL_BYTES_PER_LINE = 64
+
+# Model bytes formatted per write when streaming the header (whole lines)
+HEADER_WRITE_CHUNK_BYTES = 4096
+
+# Write buffer for the generated header file
+HEADER_WRITE_BUFFER_SIZE = 1 << 20
+
+def _string_literal_token(byte: int) -> bytes:
+    """Source text for one byte inside a C string literal."""
+    if byte in (0x22, 0x3f, 0x5c):  # '"', '?' (trigraphs) and '\\'
+        return b'\\' + bytes([byte])
+    if 0x20 <= byte < 0x7f:
+        return bytes([byte])
+    # Three-digit octal escapes never absorb the following character
+    return f'\\{byte:03o}'.encode('ascii')
+
+STRING_LITERAL_TOKENS = np.array([_string_literal_token(byte) for byte in range(256)], dtype=object)
+
+def _iter_string_literal(data: bytes,
+                         bytes_per_line: int = STRING_LITERAL_BYTES_PER_LINE,
+                         chunk_bytes: int = HEADER_WRITE_CHUNK_BYTES):
+    """
+    Yield bytes as adjacent C string literal lines, one chunk at a time.
+    
+    Printable ASCII is emitted as itself and everything else as an octal
+    escape, which is far shorter than a "0x??, " hex list for the
+    flatbuffer's tables and strings. Each line starts with a newline so
+    the caller can close the literal directly after the last chunk.
+    """
+    if not data:
+        yield b'\n    ""'
+        return
+    
+    chunk_bytes -= chunk_bytes % bytes_per_line
+    byte_values = np.frombuffer(data, dtype=np.uint8)
+    for chunk_start in range(0, len(byte_values), chunk_bytes):
+        tokens = STRING_LITERAL_TOKENS[byte_values[chunk_start:chunk_start + chunk_bytes]].tolist()
+        yield b''.join(
+            b'\n    "' + b''.join(tokens[start:start + bytes_per_line]) + b'"'
+            for start in range(0, len(tokens), bytes_per_line)
+        )
+
 class ESP32ModelDeployer:
     """
     ESP32 model deployment and management utilities.
@@ -44,6 +90,12 @@ class ESP32ModelDeployer:
         # Create directories
         self.deployment_dir.mkdir(parents=True, exist_ok=True)
         
+        # SHA256 digests keyed by (resolved path, mtime_ns, size)
+        self._hash_cache: Dict[Tuple[str, int, int], str] = {}
+        
+        # Deployment manifests of packages built by this deployer, by resolved path
+        self._manifest_cache: Dict[str, Dict] = {}
+        
         logger.info(f"Model deployer initialized. Deployment dir: {self.deployment_dir}")
     
     def _load_config(self, config: Optional[Dict]) -> Dict:
@@ -148,26 +200,31 @@ class ESP32ModelDeployer:
         with open(model_file, 'rb') as f:
             model_data = f.read()
         
-        # Generate header content
-        header_content = self._create_cpp_header_content(model_data, model_name)
-        
-        # Write header file
+        # Stream the header so the formatted model never exists as one string
         header_file = model_file.parent / f"{model_name}_model_data.h"
-        with open(header_file, 'w') as f:
-            f.write(header_content)
+        with open(header_file, 'wb', buffering=HEADER_WRITE_BUFFER_SIZE) as f:
+            for part in self._iter_cpp_header(model_data, model_name):
+                f.write(part)
         
         logger.info(f"C++ header generated: {header_file}")
         return header_file
     
-    def _create_cpp_header_content(self, model_data: bytes, model_name: str) -> str:
+    def _iter_cpp_header(self, model_data: bytes, model_name: str):
+        """Yield C++ header file content as prologue, data chunks and epilogue."""
+        yield self._create_cpp_header_prologue(model_data, model_name)
+        yield from _iter_string_literal(model_data)
+        yield self._create_cpp_header_epilogue(model_data, model_name)
+    
+    def _create_cpp_header_content(self, model_data: bytes, model_name: str) -> bytes:
         """Create C++ header file content."""
-        # Convert model data to C++ array
-        data_array = ', '.join(f'0x{byte:02x}' for byte in model_data)
-        
+        return b''.join(self._iter_cpp_header(model_data, model_name))
+    
+    def _create_cpp_header_prologue(self, model_data: bytes, model_name: str) -> bytes:
+        """Create the C++ header up to the opening of the model data literal."""
         # Create header guard
         guard_name = f"{model_name.upper()}_MODEL_DATA_H"
         
-        header_content = f"""// Auto-generated model data for {model_name}
+        prologue = f"""// Auto-generated model data for {model_name}
 // Generated by ESP32 Wildlife Camera ML Pipeline
 // DO NOT EDIT - This file is auto-generated
 
@@ -182,14 +239,22 @@ class ESP32ModelDeployer:
 #define {model_name.upper()}_MODEL_VERSION_MINOR 0
 #define {model_name.upper()}_MODEL_VERSION_PATCH 0
 
-// Model data array
-extern const unsigned char {model_name}_model_data[{len(model_data)}];
+// Model data array (one byte longer than the model for the literal's NUL)
+extern const unsigned char {model_name}_model_data[{len(model_data) + 1}];
 extern const int {model_name}_model_data_len;
 
-// Model data definition
-const unsigned char {model_name}_model_data[{len(model_data)}] = {{
-    {data_array}
-}};
+// Model data definition, as a string literal rather than a hex list for
+// much smaller source and faster compiles
+alignas(16) const unsigned char {model_name}_model_data[{len(model_data) + 1}] ="""
+        
+        return prologue.encode('utf-8')
+    
+    def _create_cpp_header_epilogue(self, model_data: bytes, model_name: str) -> bytes:
+        """Create the C++ header from the end of the model data literal."""
+        # Create header guard
+        guard_name = f"{model_name.upper()}_MODEL_DATA_H"
+        
+        epilogue = f""";
 
 const int {model_name}_model_data_len = {len(model_data)};
 
@@ -218,7 +283,7 @@ const {model_name.capitalize()}ModelConfig {model_name}_model_config = {{
 #endif // {guard_name}
 """
         
-        return header_content
+        return epilogue.encode('utf-8')
     
     def _generate_model_metadata(self, model_file: Path, model_name: str, version: str) -> Dict:
         """Generate model metadata."""
@@ -289,12 +354,25 @@ const {model_name.capitalize()}ModelConfig {model_name}_model_config = {{
             return 4  # Default
     
     def _calculate_file_hash(self, file_path: Path) -> str:
-        """Calculate SHA256 hash of file."""
-        sha256_hash = hashlib.sha256()
+        """Calculate SHA256 hash of file, reusing it while the file is unchanged."""
+        file_path = Path(file_path)
+        stat = file_path.stat()
+        key = (str(file_path.resolve()), stat.st_mtime_ns, stat.st_size)
+        if key in self._hash_cache:
+            return self._hash_cache[key]
+        
         with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(chunk)
-        return sha256_hash.hexdigest()
+            if hasattr(hashlib, 'file_digest'):
+                # Python 3.11+: hashed inside a single C call
+                digest = hashlib.file_digest(f, 'sha256').hexdigest()
+            elif stat.st_size == 0:
+                digest = hashlib.sha256().hexdigest()
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    digest = hashlib.sha256(mm).hexdigest()
+        
+        self._hash_cache[key] = digest
+        return digest
     
     def _create_deployment_manifest(self, model_name: str, version: str,
                                   model_file: Path, header_file: Path,
@@ -357,12 +435,23 @@ const {model_name.capitalize()}ModelConfig {model_name}_model_config = {{
         package_path = self.deployment_dir / package_name
         
         # Create ZIP archive
-        with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        with zipfile.ZipFile(package_path, 'w', allowZip64=True) as zipf:
             # Add all files in package directory
             for file_path in package_dir.rglob('*'):
-                if file_path.is_file():
-                    arcname = file_path.relative_to(package_dir)
-                    zipf.write(str(file_path), str(arcname))
+                if not file_path.is_file():
+                    continue
+                arcname = file_path.relative_to(package_dir)
+                if file_path.suffix == '.tflite':
+                    # Quantized flatbuffers barely compress, so skip deflate
+                    zipf.write(str(file_path), str(arcname), compress_type=zipfile.ZIP_STORED)
+                else:
+                    zipf.write(str(file_path), str(arcname),
+                               compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+        
+        # Sidecar index so listings don't have to open the archive
+        with open(self._manifest_sidecar_path(package_path), 'w') as f:
+            json.dump(manifest, f)
+        self._manifest_cache[str(package_path.resolve())] = manifest
         
         package_info = {
             'package_name': package_name,
@@ -594,13 +683,15 @@ const {model_name.capitalize()}ModelConfig {model_name}_model_config = {{
             return False
     
     def create_ota_package(self, package_path: str, 
-                          server_url: Optional[str] = None) -> Dict[str, Any]:
+                          server_url: Optional[str] = None,
+                          manifest: Optional[Dict] = None) -> Dict[str, Any]:
         """
         Create over-the-air (OTA) update package.
         
         Args:
             package_path: Path to deployment package
             server_url: Optional OTA server URL
+            manifest: Deployment manifest of the package, if already known
             
         Returns:
             OTA package information
@@ -613,15 +704,10 @@ const {model_name.capitalize()}ModelConfig {model_name}_model_config = {{
         logger.info(f"Creating OTA package from: {package_path}")
         
         # Load package manifest
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-            
-            with zipfile.ZipFile(package_path, 'r') as zipf:
-                zipf.extractall(temp_path)
-            
-            manifest_file = temp_path / 'deployment_manifest.json'
-            with open(manifest_file, 'r') as f:
-                manifest = json.load(f)
+        if manifest is None:
+            manifest = self._load_package_manifest(package_path)
+        if manifest is None:
+            raise ValueError(f"No deployment manifest in package: {package_path}")
         
         # Create OTA manifest
         ota_manifest = {
@@ -664,6 +750,32 @@ const {model_name.capitalize()}ModelConfig {model_name}_model_config = {{
         logger.info(f"OTA package created: {ota_manifest_file}")
         return ota_info
     
+    def _manifest_sidecar_path(self, package_path: Path) -> Path:
+        """Path of the manifest index written next to a deployment package."""
+        return package_path.parent / f"{package_path.name}.manifest.json"
+    
+    def _load_package_manifest(self, package_path: Path) -> Optional[Dict]:
+        """
+        Load a package's deployment manifest without extracting the archive.
+        
+        Checks the in-memory cache, then the sidecar index, then reads only
+        the manifest member from the ZIP. Returns None if the package has
+        no manifest.
+        """
+        manifest = self._manifest_cache.get(str(package_path.resolve()))
+        if manifest is not None:
+            return manifest
+        
+        sidecar_file = self._manifest_sidecar_path(package_path)
+        if sidecar_file.exists():
+            with open(sidecar_file, 'r') as f:
+                return json.load(f)
+        
+        with zipfile.ZipFile(package_path, 'r') as zipf:
+            if 'deployment_manifest.json' not in zipf.namelist():
+                return None
+            return json.loads(zipf.read('deployment_manifest.json'))
+    
     def list_deployments(self) -> List[Dict]:
         """List all available deployments."""
         deployments = []
@@ -671,28 +783,18 @@ const {model_name.capitalize()}ModelConfig {model_name}_model_config = {{
         # Find all deployment packages
         for package_file in self.deployment_dir.glob('*.zip'):
             try:
-                # Extract and read manifest
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    
-                    with zipfile.ZipFile(package_file, 'r') as zipf:
-                        zipf.extractall(temp_path)
+                manifest = self._load_package_manifest(package_file)
+                if manifest is not None:
+                    deployment_info = {
+                        'package_file': str(package_file),
+                        'model_name': manifest['deployment_info']['model_name'],
+                        'version': manifest['deployment_info']['version'],
+                        'created_at': manifest['deployment_info']['created_at'],
+                        'size_kb': package_file.stat().st_size / 1024,
+                        'model_size_kb': manifest['model_metadata']['file_size_kb']
+                    }
+                    deployments.append(deployment_info)
                     
-                    manifest_file = temp_path / 'deployment_manifest.json'
-                    if manifest_file.exists():
-                        with open(manifest_file, 'r') as f:
-                            manifest = json.load(f)
-                        
-                        deployment_info = {
-                            'package_file': str(package_file),
-                            'model_name': manifest['deployment_info']['model_name'],
-                            'version': manifest['deployment_info']['version'],
-                            'created_at': manifest['deployment_info']['created_at'],
-                            'size_kb': package_file.stat().st_size / 1024,
-                            'model_size_kb': manifest['model_metadata']['file_size_kb']
-                        }
-                        deployments.append(deployment_info)
-                        
             except Exception as e:
                 logger.warning(f"Could not read deployment package {package_file}: {e}")
         